@@ -97,19 +97,42 @@ function initNavigation() {
 
 
 // ===== LANGUAGE TOGGLE =====
+// Built pages (tools/prerender.py) exist once per language and link to each
+// other with <link rel="alternate" hreflang>; toggling just navigates there.
+// Source pages without those links fall back to swapping the text in place.
 function initLanguageToggle() {
   const langToggle = document.getElementById('langToggle');
   const flowerToggle = document.querySelector('.philosophy__flower'); // Top right flower
-  let currentLang = localStorage.getItem('preferredLang') || 'vi';
-
-  // Load saved language preference on init
-  if (currentLang !== 'vi') {
+  const alternates = document.querySelectorAll('link[rel="alternate"][hreflang]');
+  const prerendered = alternates.length > 0;
+  let currentLang = prerendered
+    ? document.documentElement.lang
+    : localStorage.getItem('preferredLang') || 'vi';
+
+  // Load saved preference on init (pre-rendered pages are already in it)
+  if (!prerendered && currentLang !== 'vi') {
     updateLanguage(currentLang);
   }
 
   // Function to toggle language
   function toggleLanguage() {
     currentLang = currentLang === 'vi' ? 'en' : 'vi';
+
+    // Save preference
+    localStorage.setItem('preferredLang', currentLang);
+    console.log(`🌐 Language switched to: ${currentLang === 'vi' ? 'Vietnamese' : 'English'}`);
+
+    if (prerendered) {
+      const target = Array.from(alternates).find(link => link.hreflang === currentLang);
+      if (target) {
+        const loader = document.querySelector('.page-loader');
+        loader?.classList.remove('loaded');
+        loader?.classList.add('transitioning');
+        window.location.href = target.href;
+        return;
+      }
+    }
+
     updateLanguage(currentLang);
 
     // Add visual feedback - only scale on mobile, rotate on desktop
@@ -138,10 +161,6 @@ function initLanguageToggle() {
         }, 500);
       }
     }
-
-    // Save preference
-    localStorage.setItem('preferredLang', currentLang);
-    console.log(`🌐 Language switched to: ${currentLang === 'vi' ? 'Vietnamese' : 'English'}`);
   }
 
   // Add click event to langToggle button
@@ -159,97 +178,10 @@ function initLanguageToggle() {
       el.textContent = lang === 'vi' ? el.dataset.vi : el.dataset.en;
     });
 
-    // Add body class for CSS targeting
+    // Body class drives the per-language desktop positions in style.css
+    document.documentElement.lang = lang;
     document.body.classList.remove('lang-vi', 'lang-en');
     document.body.classList.add(lang === 'vi' ? 'lang-vi' : 'lang-en');
-
-    if (langToggle) {
-      langToggle.title = lang === 'vi' ? '' : '';
-    }
-
-    // Update desktop positions based on language (Figma values)
-    if (window.innerWidth >= 1025) {
-      const title = document.querySelector('.philosophy__title');
-      const quote1 = document.querySelector('.philosophy__quote--first');
-      const mirror1 = document.querySelector('.philosophy__mirror--first');
-      const quote2 = document.querySelector('.philosophy__quote--second');
-      const mirror2 = document.querySelector('.philosophy__mirror--second');
-      const attribution = document.querySelector('.philosophy__attribution');
-      const mirror1P = mirror1?.querySelector('p');
-      const mirror2P = mirror2?.querySelector('p');
-
-      if (lang === 'vi') {
-        // Vietnamese positions - Matched to CSS defaults
-        if (title) {
-          title.style.left = '106px';
-          title.style.top = '600px';
-        }
-        if (quote1) {
-          quote1.style.left = '106px';
-          quote1.style.top = '750px';
-        }
-        if (mirror1) {
-          mirror1.style.left = '125px';
-          mirror1.style.top = '820px';
-        }
-        if (mirror1P) {
-          mirror1P.style.fontSize = '43px';
-        }
-        if (quote2) {
-          quote2.style.left = 'auto';
-          quote2.style.right = '108px';
-          quote2.style.textAlign = 'right';
-          quote2.style.top = '920px';
-          quote2.style.width = 'auto';
-        }
-        if (mirror2) {
-          // Let CSS handle mirror2 via body.lang-vi class
-          mirror2.style.top = '980px';
-        }
-        if (mirror2P) {
-          mirror2P.style.fontSize = '40px';
-        }
-        if (attribution) {
-          attribution.style.top = '1100px';
-        }
-      } else {
-        // English positions - Adjusted spacing to prevent overlap
-        if (title) {
-          title.style.left = '140px';
-          title.style.top = '600px';
-        }
-        if (quote1) {
-          quote1.style.left = '140px';
-          quote1.style.top = '780px';
-        }
-        if (mirror1) {
-          mirror1.style.left = '140px'; // Same as Quote 1
-          mirror1.style.top = '840px';
-        }
-        if (mirror1P) {
-          mirror1P.style.fontSize = '44px'; // Increased from 24px
-        }
-        if (quote2) {
-          // Alignment: Right aligned, fixed width to force wrap at "...is lost"
-          //quote2.style.left = 'auto';
-          quote2.style.whiteSpace = 'normal';
-          quote2.style.right = '100px';
-          quote2.style.textAlign = 'right';
-          quote2.style.top = '960px';
-          quote2.style.width = '1200px'; // Forced width to wrap text
-        }
-        if (mirror2) {
-          // Let CSS handle mirror2 via body.lang-en class
-          mirror2.style.top = '1100px';
-        }
-        if (mirror2P) {
-          mirror2P.style.fontSize = '44px'; // Increased from 24px
-        }
-        if (attribution) {
-          attribution.style.top = '1200px'; // Lowered further
-        }
-      }
-    }
   }
 }
 
@@ -0,0 +1,54 @@
+// === TEXTURE ATLAS LOADER ===
+// Slices the atlas sheets written by tools/atlas.py back into p5.Image objects,
+// so preload() fetches one or two sheets instead of one PNG per asset.
+// Until atlas/atlas.js has been generated (the committed stub sets
+// SKETCH_ATLAS to null) every image is loaded from asset/ on its own,
+// exactly as before.
+
+class SketchAtlas {
+    constructor(frameMap) {
+        this.frameMap = frameMap || null; // { sheets: [...], frames: { name: frame } }
+        this.images = {};                 // Cache: one p5.Image per frame
+        this.pending = [];                // [frame, image] pairs waiting for their sheet
+    }
+
+    // Call from preload(): starts loading every sheet
+    load() {
+        if (!this.frameMap) return this;
+        this.frameMap.sheets.forEach((src, index) => {
+            loadImage(src, (sheet) => this.slice(index, sheet));
+        });
+        return this;
+    }
+
+    // Returns the p5.Image for an asset file name, e.g. 'coin.png'.
+    // Asking for the same image twice returns the same object.
+    get(name) {
+        const frame = this.frameMap ? this.frameMap.frames[name] : null;
+        const key = frame && !frame.file ? `${frame.sheet}:${frame.x}:${frame.y}` : name;
+        if (this.images[key]) return this.images[key];
+
+        let img;
+        if (!frame) {
+            img = loadImage(`asset/${name}`);  // No atlas: load the file itself
+        } else if (frame.file) {
+            img = loadImage(frame.file);       // Too big for a sheet
+        } else {
+            // Empty image at the original size, filled in when the sheet arrives
+            img = createImage(frame.sourceW, frame.sourceH);
+            this.pending.push([frame, img]);
+        }
+        this.images[key] = img;
+        return img;
+    }
+
+    // Copy every requested frame out of a freshly loaded sheet
+    slice(index, sheet) {
+        this.pending = this.pending.filter(([frame, img]) => {
+            if (frame.sheet !== index) return true;
+            img.copy(sheet, frame.x, frame.y, frame.w, frame.h,
+                frame.offsetX, frame.offsetY, frame.w, frame.h);
+            return false;
+        });
+    }
+}
@@ -0,0 +1,3 @@
+// Generated by tools/atlas.py - do not edit.
+// Placeholder until python -m tools.atlas runs: the sketch loads each image from asset/.
+const SKETCH_ATLAS = null;
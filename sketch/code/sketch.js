@@ -143,27 +143,39 @@ function preload() {
     fontList.push(loadFont('Fonts/UTM Demian KT.otf'));
     fontList.push(loadFont('Fonts/UTM Spring.otf'));
 
-    // Load images
-    carpTetImg = loadImage('asset/carp on Tet holiday.png');
-    overlayImg = loadImage('asset/Overlay.png');
-    luckyCharmImg1 = loadImage('asset/New Year lucky charm 1.png');
-    luckyCharmImg2 = loadImage('asset/New Year lucky charm 2.png');
-    textBoxImg = loadImage('asset/text box.png');
-    towerImg = loadImage('asset/Lucky Golden Tower.png');
-    coinImg = loadImage('asset/coin.png');
-    josspaperImg1 = loadImage('asset/Josspaper 1.png');
-    josspaperImg2 = loadImage('asset/Josspaper 2.png');
-    josspaperImg3 = loadImage('asset/Josspaper 3.png');
-    josspaperImg4 = loadImage('asset/Josspaper 4.png');
-    charmImg1 = loadImage('asset/New Year lucky charm 1.png');
-    charmImg2 = loadImage('asset/New Year lucky charm 2.png');
-
-    // Load sounds
+    // Load images (sliced from the texture atlas, see atlas-loader.js)
+    const atlas = new SketchAtlas(typeof SKETCH_ATLAS !== 'undefined' ? SKETCH_ATLAS : null).load();
+    carpTetImg = atlas.get('carp on Tet holiday.png');
+    overlayImg = atlas.get('Overlay.png');
+    luckyCharmImg1 = atlas.get('New Year lucky charm 1.png');
+    luckyCharmImg2 = atlas.get('New Year lucky charm 2.png');
+    textBoxImg = atlas.get('text box.png');
+    towerImg = atlas.get('Lucky Golden Tower.png');
+    coinImg = atlas.get('coin.png');
+    josspaperImg1 = atlas.get('Josspaper 1.png');
+    josspaperImg2 = atlas.get('Josspaper 2.png');
+    josspaperImg3 = atlas.get('Josspaper 3.png');
+    josspaperImg4 = atlas.get('Josspaper 4.png');
+    charmImg1 = atlas.get('New Year lucky charm 1.png'); // Same image as luckyCharmImg1
+    charmImg2 = atlas.get('New Year lucky charm 2.png'); // Same image as luckyCharmImg2
+
+    // Load the start screen's sounds: the first click plays both, once
     soundFormats('ogg', 'mp3');
     buttonSound = loadSound('sounds/button sound.ogg');
     heavenSound = loadSound('sounds/haeven sound.ogg');
-    knockingWoodenFishSound = loadSound('sounds/knocking wooden fish.ogg');
-    ambienceSound = loadSound('sounds/Ambience sound.ogg');
+}
+
+// === SOUNDS (loaded in the background after setup) ===
+// Every sound is checked with isLoaded() before it plays, so the start
+// screen does not have to wait for the other twelve files. The two loops
+// start from their load callback if their screen was reached first.
+function loadSounds() {
+    knockingWoodenFishSound = loadSound('sounds/knocking wooden fish.ogg', () => {
+        if (showTextBoxScreen) startWoodenFish();
+    });
+    ambienceSound = loadSound('sounds/Ambience sound.ogg', () => {
+        if (showBackgroundText || showTowerTransition || showTowerScreen) startAmbience();
+    });
 
     // Load multiple typing sounds (w1–w10)
     for (let i = 1; i <= 10; i++) {
@@ -171,6 +183,22 @@ function preload() {
     }
 }
 
+// Wooden fish loop while the wish is being typed
+function startWoodenFish() {
+    if (!knockingWoodenFishSound || !knockingWoodenFishSound.isLoaded()) return;
+    knockingWoodenFishSound.setLoop(true);
+    knockingWoodenFishSound.setVolume(0.5);
+    knockingWoodenFishSound.play();
+}
+
+// Ambience loop from the floating wish text until restart
+function startAmbience() {
+    if (!ambienceSound || !ambienceSound.isLoaded()) return;
+    ambienceSound.loop();
+    ambienceSound.setVolume(0.6);
+    reverb.process(ambienceSound, 1, 0);
+}
+
 // === SETUP (Initialize canvas, variables, sliders) ===
 function setup() {
     createCanvas(windowWidth, windowHeight);   // Fullscreen canvas
@@ -279,6 +307,8 @@ function setup() {
     reverbSlider.style('width', '150px');
     reverbSlider.hide();
     reverbSlider.input(reverbSliderChanged);
+
+    loadSounds();
 }
 
 // === DRAW (Main rendering loop) ===
@@ -338,11 +368,7 @@ function touchStarted() {
             showTextBoxScreen = true;
 
             // Play wooden fish loop while typing wish
-            if (knockingWoodenFishSound && knockingWoodenFishSound.isLoaded()) {
-                knockingWoodenFishSound.setLoop(true);
-                knockingWoodenFishSound.setVolume(0.5);
-                knockingWoodenFishSound.play();
-            }
+            startWoodenFish();
         }
     }
     return false; // Prevent default browser behavior
@@ -392,11 +418,7 @@ function keyPressed() {
         if (knockingWoodenFishSound && knockingWoodenFishSound.isLoaded()) {
             knockingWoodenFishSound.stop();
         }
-        if (ambienceSound && ambienceSound.isLoaded()) {
-            ambienceSound.loop();
-            ambienceSound.setVolume(0.6);
-            reverb.process(ambienceSound, 1, 0);
-    }
+        startAmbience();
   }
 }
     }
@@ -0,0 +1,13 @@
+"""Build tooling for the DoraChann portfolio site.
+
+The site itself is plain HTML/CSS/JS and can still be opened straight from
+the repository. These modules turn that source tree into an optimised copy
+under ``dist/`` that is meant to be deployed instead. ``python -m tools.build``
+runs the whole pipeline. The images, lqip, bundle, prerender and sw commands
+take that stage's options and also run the whole build, since each stage
+works on what the earlier ones left in ``dist/``; ``python -m tools.compress``
+recompresses the tree on its own.
+
+Third-party packages (Pillow, trio, h11, selenium) are imported only by the
+stages that need them.
+"""
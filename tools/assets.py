@@ -0,0 +1,439 @@
+"""Asset reference index and audit.
+
+Starting from the site's pages (and any local page they link to), indexes
+every file the site references:
+
+* HTML attributes - ``src``, ``href``, ``srcset``, ``poster`` and friends -
+  plus ``url()`` in ``<style>`` blocks and ``style`` attributes;
+* ``url()`` in the stylesheets the pages load;
+* the p5 loaders in the scripts the pages load (``loadImage``,
+  ``loadSound``, ``loadFont``, ...), ``new Audio(...)`` and
+  ``SketchAtlas.get``. Script paths resolve against the page, as the
+  browser does; a template literal like ```sounds/w${i}.ogg``` matches every
+  file it could name.
+
+Against that index it reports:
+
+* broken references - referenced files that do not exist, each one a 404;
+* unreferenced files, collapsed to their directory when nothing in it is
+  used (``old/``);
+* duplicate images - identical bytes, or a Pillow-computed perceptual hash
+  (dHash) within ``--distance`` bits;
+* every page's payload - the page plus each local file it loads - against
+  the ``bytes`` budget in ``tools/budgets.json``. An image with a
+  ``srcset`` (its own or its ``<picture>``'s first ``<source>``) counts as
+  its largest candidate rather than its ``src`` fallback, so the check
+  means the same on the source tree and on a built ``dist/``.
+
+Broken references and pages over budget make the command fail.
+
+    python -m tools.assets [--root DIR] [--distance 6] [--json INDEX]
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import posixpath
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from . import images, site
+from .html import parse_attrs
+
+# Every attribute in REFERENCE_ATTRS is indexed, on any tag. Only the
+# (tag, attribute) pairs below, and <link> hrefs with a rel in LOADING_RELS,
+# count towards the page payload; the rest are links, hints, or alternatives
+# to a file that is already counted.
+LOADING_ATTRS = {
+    ("img", "src"),
+    ("script", "src"),
+    ("video", "src"),
+    ("video", "poster"),
+    ("audio", "src"),
+    ("embed", "src"),
+    ("object", "data"),
+}
+REFERENCE_ATTRS = {"src", "href", "srcset", "imagesrcset", "poster", "data"}
+LOADING_RELS = {"stylesheet", "icon", "apple-touch-icon", "manifest"}
+
+JS_LOADERS = {
+    "loadImage": "",
+    "loadSound": "",
+    "loadFont": "",
+    "loadJSON": "",
+    "loadStrings": "",
+    "loadTable": "",
+    "loadModel": "",
+    "loadShader": "",
+    "Audio": "",
+    # SketchAtlas.get() (sketch/code/atlas-loader.js) takes names in asset/.
+    "atlas.get": "asset/",
+}
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".bmp"}
+ASSET_SUFFIXES = IMAGE_SUFFIXES | {
+    ".svg", ".ico", ".ogg", ".mp3", ".wav", ".m4a", ".mp4", ".webm",
+    ".ttf", ".otf", ".woff", ".woff2", ".css", ".js", ".json", ".html",
+}
+
+# Everything the site ignores except the leftovers this audit is meant to find.
+AUDIT_IGNORED = site.IGNORED - {"old", "test-animation.html"}
+
+DEFAULT_DISTANCE = 6
+
+_TAG_RE = re.compile(r"<([a-zA-Z][\w-]*)\b[^>]*>")
+_STYLE_BLOCK_RE = re.compile(r"<style\b[^>]*>(.*?)</style>", re.I | re.S)
+_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_JS_RE = re.compile(
+    r"(?:\bnew\s+)?\b(" + "|".join(re.escape(name) for name in JS_LOADERS) + r")\s*\(\s*"
+    r"""(['"`])((?:(?!\2)[^\\\n]|\\.)*)\2\s*[,)]"""
+)
+
+
+@dataclass
+class Ref:
+    source: str  # file the reference is written in
+    line: int
+    target: str  # site path it resolves to
+    page: str  # page that requests it
+    loads: bool  # fetched when the page loads (counts towards its payload)
+
+
+@dataclass
+class Index:
+    root: Path
+    pages: list[str] = field(default_factory=list)
+    refs: list[Ref] = field(default_factory=list)
+    external: set[str] = field(default_factory=set)
+
+    def targets(self) -> set[str]:
+        return {ref.target for ref in self.refs}
+
+    def payload(self, page: str) -> tuple[int, list[str]]:
+        """Bytes of *page* plus every existing local file it loads."""
+        files = {page} | {ref.target for ref in self.refs if ref.page == page and ref.loads}
+        files = sorted(f for f in files if (self.root / f).is_file())
+        return sum((self.root / f).stat().st_size for f in files), files
+
+
+# ===== SCANNING =====
+
+def _line(text: str, pos: int) -> int:
+    return text.count("\n", 0, pos) + 1
+
+
+def _srcset_urls(value: str) -> list[str]:
+    return [part.split()[0] for part in value.split(",") if part.strip()]
+
+
+def _largest_candidate(value: str) -> str | None:
+    """Return the ``srcset`` candidate with the largest ``w`` or ``x`` descriptor."""
+    best, best_size = None, -1.0
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        url, *descriptor = part.split()
+        try:
+            size = float(descriptor[0][:-1]) if descriptor else 1.0
+        except ValueError:
+            continue
+        if size > best_size:
+            best, best_size = url, size
+    return best
+
+
+def _expand(root: Path, target: str) -> list[str]:
+    """Turn a path containing ``*`` (from a template literal) into the files it matches."""
+    if "*" not in target:
+        return [target]
+    directory = root / posixpath.dirname(target)
+    if not directory.is_dir():
+        return [target]
+    pattern = posixpath.basename(target)
+    names = sorted(p.name for p in directory.iterdir() if fnmatch.fnmatch(p.name, pattern))
+    found = [posixpath.join(posixpath.dirname(target), name) for name in names]
+    return found or [target]
+
+
+def html_refs(text: str, page: str) -> list[tuple[int, str, bool]]:
+    """Return ``(offset, reference, loads)`` for every reference in a page.
+
+    Of an image with a ``srcset``, only the largest candidate loads: the one
+    a wide, dense screen picks, and an upper bound for the others.
+    """
+    found = []
+    source = None  # largest candidate of the open <picture>'s first <source>
+    for m in _TAG_RE.finditer(text):
+        name = m.group(1).lower()
+        attrs = parse_attrs(m.group(0))
+        rels = set((attrs.get("rel") or "").lower().split())
+        largest = None
+        if name == "picture":
+            source = None
+        elif name == "source" and source is None and attrs.get("srcset"):
+            source = _largest_candidate(attrs["srcset"])
+            found.append((m.start(), source, True))
+        elif name == "img":
+            largest = source or _largest_candidate(attrs.get("srcset") or "")
+            if largest and not source:
+                found.append((m.start(), largest, True))
+            source = None
+        for attr in REFERENCE_ATTRS & attrs.keys():
+            value = attrs[attr]
+            if not value:
+                continue
+            loads = (name, attr) in LOADING_ATTRS or (name == "link" and attr == "href" and bool(rels & LOADING_RELS))
+            if attr == "src" and name in ("audio", "video") and attrs.get("preload") == "none":
+                loads = False  # fetched only once played
+            if attr == "src" and name == "img" and largest:
+                loads = False  # the fallback for browsers without srcset
+            if attr in ("srcset", "imagesrcset"):
+                found += [(m.start(), url, False) for url in _srcset_urls(value)]
+            else:
+                found.append((m.start(), value, loads))
+        if attrs.get("style"):
+            found += [(m.start(), u.group(2), True) for u in _URL_RE.finditer(attrs["style"])]
+    for block in _STYLE_BLOCK_RE.finditer(text):
+        found += [(block.start(1) + u.start(), u.group(2), True) for u in _URL_RE.finditer(block.group(1))]
+    return found
+
+
+def css_refs(text: str) -> list[tuple[int, str]]:
+    return [(m.start(), m.group(2)) for m in _URL_RE.finditer(text)]
+
+
+def js_refs(text: str) -> list[tuple[int, str]]:
+    found = []
+    for m in _JS_RE.finditer(text):
+        value = m.group(3)
+        if m.group(2) == "`":
+            value = re.sub(r"\$\{[^}]*\}", "*", value)
+            if "*" in posixpath.basename(value) and not posixpath.basename(value).strip("*"):
+                continue  # the whole file name is dynamic; nothing to match
+        found.append((m.start(), JS_LOADERS[m.group(1)] + value))
+    return found
+
+
+def scan(root: Path) -> Index:
+    """Index every reference reachable from the site's pages under *root*."""
+    index = Index(root)
+    queue = list(site.pages(root))
+    seen = set(queue)
+    file_cache: dict[str, list[tuple[int, str]]] = {}
+
+    def add(source: str, text: str, pos: int, ref: str, base: str, page: str, loads: bool) -> str | None:
+        if not site.is_local(ref):
+            if ref.startswith(("http://", "https://", "//")):
+                index.external.add(ref)
+            return None
+        for target in _expand(root, site.resolve(base, ref)):
+            index.refs.append(Ref(source, _line(text, pos), target, page, loads))
+        return site.resolve(base, ref)
+
+    while queue:
+        page = queue.pop(0)
+        index.pages.append(page)
+        text = (root / page).read_text("utf-8", errors="replace")
+        for pos, ref, loads in html_refs(text, page):
+            target = add(page, text, pos, ref, page, page, loads)
+            if target is None or not (root / target).is_file():
+                continue
+            if target.endswith(".html") and target not in seen:
+                seen.add(target)
+                queue.append(target)
+            elif target.endswith(".css") and loads:
+                sub = (root / target).read_text("utf-8", errors="replace")
+                for sub_pos, sub_ref in file_cache.setdefault(target, css_refs(sub)):
+                    add(target, sub, sub_pos, sub_ref, target, page, True)
+            elif target.endswith(".js") and loads:
+                sub = (root / target).read_text("utf-8", errors="replace")
+                # Script paths resolve against the page, not the script.
+                for sub_pos, sub_ref in file_cache.setdefault(target, js_refs(sub)):
+                    add(target, sub, sub_pos, sub_ref, page, page, True)
+    return index
+
+
+# ===== CHECKS =====
+
+def broken(index: Index) -> list[Ref]:
+    """Return each reference to a missing file once, however many pages hit it."""
+    found: dict[tuple[str, int, str], Ref] = {}
+    for ref in index.refs:
+        if not (index.root / ref.target).exists():
+            found.setdefault((ref.source, ref.line, ref.target), ref)
+    return list(found.values())
+
+
+def _audited_files(root: Path) -> list[str]:
+    found = []
+    for path in sorted(root.rglob("*")):
+        rel = path.relative_to(root)
+        if any(part in AUDIT_IGNORED or part.startswith(".") for part in rel.parts):
+            continue
+        if path.is_file() and path.suffix.lower() in ASSET_SUFFIXES:
+            found.append(rel.as_posix())
+    return found
+
+
+def unreferenced(index: Index) -> list[tuple[str, int, int]]:
+    """Return ``(path, files, bytes)`` for unused files and wholly unused directories."""
+    files = _audited_files(index.root)
+    used = index.targets() | set(index.pages)
+    unused = [f for f in files if f not in used]
+
+    def dead(directory: str) -> bool:
+        prefix = directory + "/"
+        return all(f not in used for f in files if f.startswith(prefix))
+
+    out: dict[str, tuple[int, int]] = {}
+    for f in unused:
+        key = f
+        parts = f.split("/")[:-1]
+        for depth in range(1, len(parts) + 1):
+            directory = "/".join(parts[:depth])
+            if dead(directory):
+                key = directory + "/"
+                break
+        count, size = out.get(key, (0, 0))
+        out[key] = (count + 1, size + (index.root / f).stat().st_size)
+    return [(path, count, size) for path, (count, size) in sorted(out.items())]
+
+
+def dhash(path: Path) -> tuple[int, float] | None:
+    """Return a 64-bit difference hash and the aspect ratio, or None if unreadable."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(path) as im:
+            im.seek(0)
+            im = im.convert("RGBA")
+    except (UnidentifiedImageError, OSError):
+        return None  # e.g. a Git LFS pointer
+    flat = Image.alpha_composite(Image.new("RGBA", im.size, "white"), im)
+    pixels = flat.convert("L").resize((9, 8), Image.Resampling.LANCZOS).tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = bits << 1 | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits, im.width / im.height
+
+
+def duplicates(root: Path, paths: list[str], distance: int) -> list[list[dict]]:
+    """Group images that are byte-identical or perceptually within *distance* bits."""
+    hashed = []
+    for rel in paths:
+        result = dhash(root / rel)
+        if result is not None:
+            hashed.append((rel, *result, site.file_hash(root / rel)))
+
+    parent = list(range(len(hashed)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, (_, hash_a, ratio_a, sha_a) in enumerate(hashed):
+        for j in range(i + 1, len(hashed)):
+            _, hash_b, ratio_b, sha_b = hashed[j]
+            same_shape = abs(ratio_a - ratio_b) <= 0.1 * max(ratio_a, ratio_b)
+            if sha_a == sha_b or (same_shape and bin(hash_a ^ hash_b).count("1") <= distance):
+                parent[find(j)] = find(i)
+
+    groups: dict[int, list[int]] = {}
+    for i in range(len(hashed)):
+        groups.setdefault(find(i), []).append(i)
+    out = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        first_hash, first_sha = hashed[members[0]][1], hashed[members[0]][3]
+        out.append([
+            {
+                "path": hashed[i][0],
+                "bytes": (root / hashed[i][0]).stat().st_size,
+                "identical": hashed[i][3] == first_sha,
+                "distance": bin(hashed[i][1] ^ first_hash).count("1"),
+            }
+            for i in members
+        ])
+    return out
+
+
+def _image_candidates(index: Index, dead: list[str]) -> list[str]:
+    skip = tuple(d for d in dead if d.endswith("/")) + (images.OUTPUT_DIR + "/",)
+    return [
+        f for f in _audited_files(index.root)
+        if Path(f).suffix.lower() in IMAGE_SUFFIXES and not f.startswith(skip)
+    ]
+
+
+# ===== REPORT =====
+
+def _kb(size: int) -> str:
+    return f"{size / 1024:,.0f} KB"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--root", type=Path, default=site.ROOT, help="site tree to audit (default: the source tree)")
+    parser.add_argument("--distance", type=int, default=DEFAULT_DISTANCE,
+                        help="max differing dHash bits for two images to count as duplicates")
+    parser.add_argument("--budgets", type=Path, default=site.BUDGETS, help="JSON file of per-page byte budgets")
+    parser.add_argument("--json", type=Path, help="also write the full index and findings to this file")
+    args = parser.parse_args(argv)
+
+    root = args.root.resolve()
+    index = scan(root)
+    missing = broken(index)
+    unused = unreferenced(index)
+    dupes = duplicates(root, _image_candidates(index, [path for path, _, _ in unused]), args.distance)
+    budgets = site.load_budgets(args.budgets)
+
+    print(f"assets: {len(index.pages)} pages, {len(index.refs)} references, {len(index.external)} external URLs")
+
+    for ref in missing:
+        print(f"assets: broken: {ref.source}:{ref.line} -> {ref.target}")
+
+    for path, count, size in unused:
+        files = f"{count} files, " if path.endswith("/") else ""
+        print(f"assets: unreferenced: {path} ({files}{_kb(size)})")
+
+    for group in dupes:
+        names = ", ".join(
+            f"{m['path']} ({_kb(m['bytes'])}{', identical' if m['identical'] else ''})" for m in group
+        )
+        print(f"assets: duplicates: {names}")
+
+    over = []
+    payloads = {}
+    for page in index.pages:
+        size, files = index.payload(page)
+        payloads[page] = {"bytes": size, "files": files}
+        limit = site.budget_for(budgets, page).get("bytes")
+        status = ""
+        if limit is not None and size > limit:
+            over.append(page)
+            status = f"  OVER BUDGET ({_kb(limit)})"
+        print(f"assets: payload: {page:<32} {_kb(size):>10} in {len(files)} files{status}")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "pages": payloads,
+            "references": [asdict(ref) for ref in index.refs],
+            "external": sorted(index.external),
+            "broken": [asdict(ref) for ref in missing],
+            "unreferenced": [{"path": p, "files": c, "bytes": s} for p, c, s in unused],
+            "duplicates": dupes,
+        }, indent=2) + "\n", "utf-8")
+
+    if missing or over:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Texture atlas packer for the p5 sketch in ``sketch/code``.
+
+Packs the sketch's PNGs into one or a few atlas sheets and writes the frame
+map that ``sketch/code/atlas-loader.js`` uses to slice them back into
+``p5.Image`` objects, so the sketch needs two requests for its images
+instead of one per file.
+
+* Transparent borders are trimmed before packing; the loader restores them,
+  so every sliced image keeps its original size.
+* Images with identical pixels are stored once.
+* Sheets never exceed ``--max-size`` pixels per side (2048 by default, which
+  every mobile GPU accepts). An image too big for a sheet stays a separate
+  file and the frame map says so.
+
+Run it wherever the real images are checked out (they are stored in Git LFS):
+
+    python -m tools.atlas [--max-size 2048]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from . import site
+
+SKETCH_DIR = site.ROOT / "sketch" / "code"
+SOURCE_DIR = SKETCH_DIR / "asset"
+OUTPUT_DIR = SKETCH_DIR / "atlas"
+
+# Loaded by index.html as the favicon, never by the sketch.
+EXCLUDE = {"logo.png"}
+
+MAX_SIZE = 2048
+PADDING = 1
+
+
+@dataclass(eq=False)
+class Frame:
+    names: list[str]
+    image: object  # PIL.Image.Image, trimmed
+    source_size: tuple[int, int]
+    offset: tuple[int, int]
+    sheet: int = -1
+    x: int = 0
+    y: int = 0
+
+
+class Skyline:
+    """Bottom-left skyline bin packer for one square sheet."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.nodes = [[0, 0, size]]  # x, y, width of each skyline segment
+
+    def _fit(self, index: int, w: int, h: int) -> int | None:
+        x = self.nodes[index][0]
+        if x + w > self.size:
+            return None
+        y, remaining, i = 0, w, index
+        while remaining > 0:
+            if i == len(self.nodes):
+                return None
+            y = max(y, self.nodes[i][1])
+            if y + h > self.size:
+                return None
+            remaining -= self.nodes[i][2]
+            i += 1
+        return y
+
+    def insert(self, w: int, h: int) -> tuple[int, int] | None:
+        """Place a *w* x *h* rectangle; return its position, or None if full."""
+        best = None
+        for i, (x, _, _) in enumerate(self.nodes):
+            y = self._fit(i, w, h)
+            if y is not None and (best is None or (y + h, x) < (best[1] + h, best[2])):
+                best = (i, y, x)
+        if best is None:
+            return None
+        index, y, x = best
+        self.nodes.insert(index, [x, y + h, w])
+        i = index + 1
+        while i < len(self.nodes):
+            prev_end = self.nodes[i - 1][0] + self.nodes[i - 1][2]
+            node = self.nodes[i]
+            if node[0] >= prev_end:
+                break
+            shrink = prev_end - node[0]
+            node[0] += shrink
+            node[2] -= shrink
+            if node[2] > 0:
+                break
+            del self.nodes[i]
+        i = 0
+        while i < len(self.nodes) - 1:
+            if self.nodes[i][1] == self.nodes[i + 1][1]:
+                self.nodes[i][2] += self.nodes.pop(i + 1)[2]
+            else:
+                i += 1
+        return x, y
+
+
+def load_frames(paths: list[Path]) -> list[Frame]:
+    """Open, trim and deduplicate the images in *paths*."""
+    from PIL import Image, UnidentifiedImageError
+
+    frames: dict[str, Frame] = {}
+    for path in paths:
+        try:
+            im = Image.open(path)
+            im.load()
+        except UnidentifiedImageError:
+            raise SystemExit(f"{path}: not an image - is it a Git LFS pointer? Run `git lfs pull`.") from None
+        im = im.convert("RGBA")
+        key = hashlib.sha256(f"{im.size}".encode() + im.tobytes()).hexdigest()
+        if key in frames:
+            frames[key].names.append(path.name)
+            continue
+        bbox = im.getchannel("A").getbbox() or (0, 0, 1, 1)
+        frames[key] = Frame([path.name], im.crop(bbox), im.size, bbox[:2])
+    return list(frames.values())
+
+
+def pack(frames: list[Frame], max_size: int) -> tuple[int, list[Frame]]:
+    """Assign every frame a sheet and position; return (sheet count, loose frames)."""
+    sheets: list[Skyline] = []
+    loose = []
+    for frame in sorted(frames, key=lambda f: (f.image.height, f.image.width), reverse=True):
+        w, h = frame.image.width + 2 * PADDING, frame.image.height + 2 * PADDING
+        if w > max_size or h > max_size:
+            loose.append(frame)
+            continue
+        for index, sheet in enumerate(sheets):
+            spot = sheet.insert(w, h)
+            if spot:
+                break
+        else:
+            sheets.append(Skyline(max_size))
+            index, spot = len(sheets) - 1, sheets[-1].insert(w, h)
+        frame.sheet, frame.x, frame.y = index, spot[0] + PADDING, spot[1] + PADDING
+    return len(sheets), loose
+
+
+def _from_sketch(path: Path) -> str:
+    return Path(os.path.relpath(path, SKETCH_DIR)).as_posix()
+
+
+def write(frames: list[Frame], sheet_count: int, loose: list[Frame], src_dir: Path, out_dir: Path) -> dict:
+    """Render the sheets into *out_dir* and return the frame map.
+
+    Paths in the map are relative to ``sketch/code``, where the sketch runs.
+    """
+    from PIL import Image
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.glob("atlas-*.png"):
+        old.unlink()
+
+    sheets = []
+    for index in range(sheet_count):
+        members = [f for f in frames if f.sheet == index]
+        width = max(f.x + f.image.width + PADDING for f in members)
+        height = max(f.y + f.image.height + PADDING for f in members)
+        canvas = Image.new("RGBA", (width, height))
+        for f in members:
+            canvas.paste(f.image, (f.x, f.y))
+        path = out_dir / f"atlas-{index}.png"
+        canvas.save(path, optimize=True)
+        # Content-hashed names let tools.serve mark the sheets immutable.
+        hashed = path.with_name(f"atlas-{index}.{site.file_hash(path)[:8]}.png")
+        path.rename(hashed)
+        sheets.append(_from_sketch(hashed))
+
+    entries: dict[str, dict] = {}
+    for f in frames:
+        for name in f.names:
+            if f in loose:
+                entries[name] = {"file": _from_sketch(src_dir / name)}
+                continue
+            entries[name] = {
+                "sheet": f.sheet,
+                "x": f.x,
+                "y": f.y,
+                "w": f.image.width,
+                "h": f.image.height,
+                "sourceW": f.source_size[0],
+                "sourceH": f.source_size[1],
+                "offsetX": f.offset[0],
+                "offsetY": f.offset[1],
+            }
+    return {"sheets": sheets, "frames": dict(sorted(entries.items()))}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--src", type=Path, default=SOURCE_DIR, help="directory of source PNGs")
+    parser.add_argument("--out", type=Path, default=OUTPUT_DIR, help="where to write the sheets and frame map")
+    parser.add_argument("--max-size", type=int, default=MAX_SIZE, help="maximum sheet width/height in pixels")
+    args = parser.parse_args(argv)
+
+    paths = sorted(p for p in args.src.glob("*.png") if p.name not in EXCLUDE)
+    frames = load_frames(paths)
+    sheet_count, loose = pack(frames, args.max_size)
+    frame_map = write(frames, sheet_count, loose, args.src.resolve(), args.out.resolve())
+
+    payload = json.dumps(frame_map, indent=2)
+    (args.out / "atlas.json").write_text(payload + "\n", "utf-8")
+    # The same map as a script, so the sketch gets it without a preload
+    # request that would stall p5 if the atlas has not been generated.
+    (args.out / "atlas.js").write_text(
+        f"// Generated by tools/atlas.py - do not edit.\nconst SKETCH_ATLAS = {payload};\n", "utf-8"
+    )
+    print(
+        f"atlas: {len(paths)} images ({len(paths) - len(frames)} duplicates) "
+        f"-> {sheet_count} sheet(s), {len(loose)} left as separate files"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Page-load benchmark in headless Chrome.
+
+Serves a site tree (``dist/`` by default) with ``tools.serve`` and loads
+every page at the mobile, tablet and desktop widths ``detectDevice()``
+distinguishes, each time on a cold cache, spread over a pool of parallel
+WebDriver sessions. Every load records:
+
+* Navigation Timing: time to first byte, DOMContentLoaded and load;
+* first contentful paint, Largest Contentful Paint and Cumulative Layout
+  Shift;
+* bytes transferred for the document and everything it fetched, taken from
+  the DevTools network events so cross-origin files (p5 from the CDN, Google
+  Fonts) are counted too;
+* when ``.page-loader`` received its ``loaded`` class, i.e. when the page
+  was actually revealed.
+
+Each run is appended to ``.bench/history.jsonl`` and, one row per page and
+device, to ``.bench/history.csv``. The run fails when a page goes over the
+byte or LCP budget set in ``tools/budgets.json``.
+
+    python -m tools.bench [PAGE ...] [--root DIR] [--sessions 4] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime
+import json
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from . import browser, site
+
+HISTORY_DIR = site.ROOT / ".bench"
+
+# Installed before the page's own scripts so no entry or class change is missed.
+OBSERVE_SCRIPT = """
+window.__bench = {lcp: null, cls: 0, loader: null};
+new PerformanceObserver((list) => {
+  for (const entry of list.getEntries()) window.__bench.lcp = entry.startTime;
+}).observe({type: 'largest-contentful-paint', buffered: true});
+new PerformanceObserver((list) => {
+  for (const entry of list.getEntries()) if (!entry.hadRecentInput) window.__bench.cls += entry.value;
+}).observe({type: 'layout-shift', buffered: true});
+document.addEventListener('DOMContentLoaded', () => {
+  const loader = document.querySelector('.page-loader');
+  if (!loader) return;
+  const check = () => {
+    if (window.__bench.loader === null && loader.classList.contains('loaded')) {
+      window.__bench.loader = performance.now();
+    }
+  };
+  new MutationObserver(check).observe(loader, {attributes: true, attributeFilter: ['class']});
+  check();
+});
+"""
+
+READY_SCRIPT = """
+return document.readyState === 'complete' && !!window.__bench &&
+  (window.__bench.loader !== null || !document.querySelector('.page-loader'));
+"""
+
+COLLECT_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+return {
+  ttfb_ms: nav.responseStart,
+  dcl_ms: nav.domContentLoadedEventEnd,
+  load_ms: nav.loadEventEnd,
+  fcp_ms: fcp ? fcp.startTime : null,
+  lcp_ms: window.__bench.lcp,
+  cls: window.__bench.cls,
+  loader_ms: window.__bench.loader,
+};
+"""
+
+METRICS = ("ttfb_ms", "fcp_ms", "dcl_ms", "load_ms", "lcp_ms", "cls", "loader_ms", "bytes", "requests")
+
+
+def _network_totals(driver) -> tuple[int, int]:
+    """Sum the bytes of every request finished since the log was last read."""
+    total = requests = 0
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        if message["method"] == "Network.loadingFinished":
+            total += int(message["params"]["encodedDataLength"])
+            requests += 1
+    return total, requests
+
+
+class Pool:
+    """One Chrome session per worker thread, reused across page loads."""
+
+    def __init__(self, binary: str | None) -> None:
+        self.binary = binary
+        self.local = threading.local()
+        self.drivers: list = []
+        self.lock = threading.Lock()
+
+    def driver(self):
+        driver = getattr(self.local, "driver", None)
+        if driver is None:
+            driver = browser.chrome(self.binary, performance_log=True)
+            browser.on_new_document(driver, OBSERVE_SCRIPT)
+            self.local.driver = driver
+            with self.lock:
+                self.drivers.append(driver)
+        return driver
+
+    def close(self) -> None:
+        for driver in self.drivers:
+            driver.quit()
+
+
+def measure(pool: Pool, base: str, page: str, device: str, timeout: float) -> dict:
+    """Load *page* once at *device* width on a cold cache."""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    driver = pool.driver()
+    browser.reset(driver, base)
+    browser.set_viewport(driver, device)
+    driver.get_log("performance")  # drop events from earlier loads
+    driver.get(f"{base}/{page}")
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.05).until(lambda d: d.execute_script(READY_SCRIPT))
+    except TimeoutException:
+        pass  # recorded as loader_ms = None
+    time.sleep(0.5)  # let a late LCP candidate or layout shift land
+    result = driver.execute_script(COLLECT_SCRIPT)
+    result["bytes"], result["requests"] = _network_totals(driver)
+    return result
+
+
+def _median(samples: list[dict]) -> dict:
+    out = {}
+    for key in METRICS:
+        values = [s[key] for s in samples if s.get(key) is not None]
+        out[key] = round(statistics.median(values), 4 if key == "cls" else 1) if values else None
+    return out
+
+
+def run(root: Path, pages: list[str], sessions: int, repeat: int, timeout: float, binary: str | None) -> list[dict]:
+    """Benchmark every page at every device width; return one row per pair."""
+    jobs = [(page, device) for page in pages for device in browser.VIEWPORTS for _ in range(repeat)]
+    pool = Pool(binary)
+    samples: dict[tuple[str, str], list[dict]] = {}
+    try:
+        with browser.local_server(root) as base, ThreadPoolExecutor(max_workers=sessions) as executor:
+            futures = [(job, executor.submit(measure, pool, base, *job, timeout)) for job in jobs]
+            for job, future in futures:
+                samples.setdefault(job, []).append(future.result())
+    finally:
+        pool.close()
+    return [{"page": page, "device": device, **_median(runs)} for (page, device), runs in samples.items()]
+
+
+def check_budgets(rows: list[dict], budgets: dict) -> list[str]:
+    failures = []
+    for row in rows:
+        budget = site.budget_for(budgets, row["page"])
+        where = f"{row['page']} ({row['device']})"
+        if "bytes" in budget and row["bytes"] is not None and row["bytes"] > budget["bytes"]:
+            failures.append(f"{where}: {row['bytes']} bytes > budget {budget['bytes']}")
+        if "lcp_ms" in budget and row["lcp_ms"] is not None and row["lcp_ms"] > budget["lcp_ms"]:
+            failures.append(f"{where}: LCP {row['lcp_ms']} ms > budget {budget['lcp_ms']} ms")
+        if row["loader_ms"] is None:
+            failures.append(f"{where}: .page-loader never got the loaded class")
+    return failures
+
+
+def _commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=site.ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def save_history(rows: list[dict], root: Path, out_dir: Path) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    commit = _commit()
+    with (out_dir / "history.jsonl").open("a", encoding="utf-8") as fh:
+        fh.write(json.dumps({"time": stamp, "commit": commit, "root": str(root), "results": rows}) + "\n")
+    csv_path = out_dir / "history.csv"
+    fields = ["time", "commit", "page", "device", *METRICS]
+    new = not csv_path.exists()
+    with csv_path.open("a", encoding="utf-8", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=fields)
+        if new:
+            writer.writeheader()
+        for row in rows:
+            writer.writerow({"time": stamp, "commit": commit, **row})
+
+
+def _fmt(value, suffix: str = "") -> str:
+    return "-" if value is None else f"{value}{suffix}"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("pages", nargs="*", help="pages to load (default: every page)")
+    parser.add_argument("--root", type=Path, default=site.DIST, help="site tree to serve (default: dist/)")
+    parser.add_argument("--sessions", type=int, default=4, help="parallel WebDriver sessions")
+    parser.add_argument("--repeat", type=int, default=1, help="loads per page and device; the median is kept")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for the page loader")
+    parser.add_argument("--budgets", type=Path, default=site.BUDGETS, help="JSON file of byte/LCP budgets")
+    parser.add_argument("--out", type=Path, default=HISTORY_DIR, help="where history.jsonl/.csv are appended")
+    parser.add_argument("--chrome", help="Chrome/Chromium binary (default: let Selenium find one)")
+    args = parser.parse_args(argv)
+
+    root = args.root.resolve()
+    pages = args.pages or site.pages(root)
+    started = time.perf_counter()
+    rows = run(root, pages, args.sessions, args.repeat, args.timeout, args.chrome)
+    elapsed = time.perf_counter() - started
+    save_history(rows, root, args.out)
+
+    for row in rows:
+        print(
+            f"bench: {row['page']:<32} {row['device']:<8} "
+            f"{_fmt(row['bytes'] and round(row['bytes'] / 1024), ' KB'):>9} "
+            f"LCP {_fmt(row['lcp_ms'], ' ms'):>10}  CLS {_fmt(row['cls']):>7}  "
+            f"loaded {_fmt(row['loader_ms'], ' ms'):>10}"
+        )
+    print(f"bench: {len(rows)} page/device pairs in {elapsed:.1f}s")
+
+    failures = check_budgets(rows, site.load_budgets(args.budgets))
+    for failure in failures:
+        print(f"bench: over budget: {failure}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Headless Chrome helpers shared by ``tools.bench`` and ``tools.profile``.
+
+Serves a site tree with ``tools.serve`` on a background thread and starts
+Selenium Chrome sessions whose viewport matches one of the device classes
+``detectDevice()`` in ``js/background.js`` switches between.
+
+Selenium is imported only here, so the build stages never need it.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import queue
+import threading
+from functools import partial
+from pathlib import Path
+from typing import Iterator
+
+import trio
+
+from . import serve
+
+# detectDevice(): < 600 px is mobile, < 1024 px tablet, anything wider desktop.
+VIEWPORTS = {
+    "mobile": (390, 844),
+    "tablet": (820, 1180),
+    "desktop": (1440, 900),
+}
+
+
+async def _serve_in_thread(root: Path, ready: queue.Queue) -> None:
+    async with trio.open_nursery() as nursery:
+        listeners = await nursery.start(partial(serve.serve, root, "127.0.0.1", 0, False))
+        port = listeners[0].socket.getsockname()[1]
+        ready.put((port, trio.lowlevel.current_trio_token(), nursery.cancel_scope))
+
+
+@contextlib.contextmanager
+def local_server(root: Path) -> Iterator[str]:
+    """Serve *root* on a free localhost port; yield its base URL."""
+    ready: queue.Queue = queue.Queue()
+    thread = threading.Thread(target=trio.run, args=(_serve_in_thread, root, ready), daemon=True)
+    thread.start()
+    port, token, scope = ready.get(timeout=10)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        token.run_sync_soon(scope.cancel)
+        thread.join(timeout=10)
+
+
+def chrome(binary: str | None = None, performance_log: bool = False, trace_categories: str | None = None):
+    """Start a headless Chrome session.
+
+    With *performance_log* the session records DevTools network and page
+    events in the ``performance`` log; *trace_categories* adds Chrome trace
+    events for those categories to the same log.
+    """
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--autoplay-policy=no-user-gesture-required")
+    options.add_argument("--mute-audio")
+    if binary:
+        options.binary_location = binary
+    if performance_log or trace_categories:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    if trace_categories:
+        prefs = {"enableNetwork": performance_log, "enablePage": False, "traceCategories": trace_categories}
+        options.add_experimental_option("perfLoggingPrefs", prefs)
+    return webdriver.Chrome(options=options)
+
+
+def set_viewport(driver, device: str) -> None:
+    """Emulate the *device* viewport exactly, independent of window chrome."""
+    width, height = VIEWPORTS[device]
+    mobile = device != "desktop"
+    driver.execute_cdp_cmd(
+        "Emulation.setDeviceMetricsOverride",
+        {"width": width, "height": height, "deviceScaleFactor": 2 if mobile else 1, "mobile": mobile},
+    )
+
+
+def reset(driver, origin: str) -> None:
+    """Forget cache, cookies and *origin*'s storage so the next load is a first visit."""
+    driver.get("about:blank")
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+
+def on_new_document(driver, source: str) -> None:
+    """Run *source* in every page before any of the page's own scripts."""
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})
@@ -0,0 +1,48 @@
+"""Run every build stage, in order, to produce ``dist/``.
+
+The stages rewrite the staged pages in turn, and staging copies the pages
+fresh from the source tree, so the stages only make sense together: each
+stage's own command (``python -m tools.lqip`` and so on) also runs the whole
+build, with that stage's options.
+
+    python -m tools.build [--jobs N]
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from . import bundle, compress, images, lqip, prerender, site, sw
+
+
+def run(
+    dist: Path = site.DIST,
+    jobs: int | None = None,
+    placeholder: str = "blur",
+    strict: bool = False,
+    media_budget: int = sw.DEFAULT_MEDIA_BUDGET_MB,
+) -> None:
+    """Stage the source tree into *dist* and run every stage on it."""
+    site.stage(dist)
+    images.run(dist, jobs)
+    lqip.run(dist, placeholder)
+    bundle.run(dist)
+    prerender.run(dist, strict)
+    sw.run(dist, media_budget)
+    compress.run(dist)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dist", type=Path, default=site.DIST, help="output tree (default: dist/)")
+    parser.add_argument("--jobs", type=int, default=None, help="image encoder processes (default: all cores)")
+    parser.add_argument("--placeholder", choices=lqip.MODES, default="blur", help="image placeholder kind")
+    parser.add_argument("--strict", action="store_true", help="fail when a page is missing a translation")
+    parser.add_argument("--media-budget", type=int, default=sw.DEFAULT_MEDIA_BUDGET_MB, help="MB of cached sound/video")
+    args = parser.parse_args(argv)
+    run(args.dist, args.jobs, args.placeholder, args.strict, args.media_budget)
+
+
+if __name__ == "__main__":
+    main()
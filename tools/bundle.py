@@ -0,0 +1,246 @@
+"""CSS/JS bundling stage.
+
+Each page's local stylesheets and scripts are concatenated, minified and
+written as ``css/bundle.<hash>.css`` / ``js/bundle.<hash>.js``. Because the
+name changes whenever the content does, the bundles can be served with
+long-lived cache headers. Pages that load the same files share a bundle.
+
+The rules styling the page loader, the header and the page's hero are also
+inlined into a ``<style>`` block, and the full stylesheet is then loaded
+without blocking first paint.
+
+``dist/.build/bundles.json`` records which input files (and their hashes)
+every bundle was built from, so editing one file only rebuilds the bundles
+that include it.
+
+    python -m tools.bundle
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+from pathlib import Path
+
+from . import minify, site
+from .html import parse_attrs, render
+
+# BEM blocks that are visible before the first scroll on some page. A rule
+# is inlined when one of its selectors starts with one of these blocks (or
+# one of their __elements / --modifiers).
+CRITICAL_BLOCKS = (
+    ":root",
+    "*",
+    "html",
+    "body",
+    "picture",
+    ".page-loader",
+    ".header",
+    ".nav",
+    ".home-1",
+    ".about-hero",
+    ".gallery",
+    ".project__back",
+    ".project__hero",
+    ".project__header",
+)
+
+_CRITICAL_RE = re.compile(
+    r"^(?:%s)(?:(?:__|--)[\w-]+)?(?![\w-])" % "|".join(re.escape(block) for block in CRITICAL_BLOCKS)
+)
+_STYLESHEET_RE = re.compile(r"<link\b[^>]*>", re.I)
+_SCRIPT_RE = re.compile(r"<script\b[^>]*>\s*</script>", re.I)
+_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_ANIMATION_RE = re.compile(r"animation(?:-name)?:([^;}]+)")
+
+# Marks a tag for removal together with the rest of its line.
+_DROP = "\0"
+
+
+def rebase_urls(text: str, src: str, dest: str) -> str:
+    """Rewrite relative ``url()`` references in *src* so they work from *dest*."""
+
+    def repl(m: re.Match[str]) -> str:
+        ref = m.group(2)
+        if not site.is_local(ref) or ref.startswith("/"):
+            return m.group(0)
+        return f"url({m.group(1)}{site.relative(dest, site.resolve(src, ref))}{m.group(1)})"
+
+    return _URL_RE.sub(repl, text)
+
+
+def _concat_css(parts: list[str]) -> str:
+    # @import and @charset are only valid at the top of a stylesheet.
+    head, body = [], []
+    for part in parts:
+        for prelude, block in minify.css_blocks(part):
+            target = head if block is None and prelude.startswith(("@import", "@charset")) else body
+            target.append((prelude, block))
+    return minify.css_join(head + body) + "\n"
+
+
+def build_bundle(dist: Path, kind: str, inputs: tuple[str, ...], manifest: site.Manifest) -> tuple[str, bool]:
+    """Build (or reuse) the bundle of *inputs*; return its path and whether it was rebuilt."""
+    key = f"{kind}:{'|'.join(inputs)}"
+    hashes = {path: site.file_hash(dist / path) for path in inputs}
+    entry = manifest.get(key)
+    if entry and entry["inputs"] == hashes and (dist / entry["output"]).is_file():
+        return entry["output"], False
+
+    placeholder = f"{kind}/bundle.{kind}"
+    if kind == "css":
+        parts = [minify.css(rebase_urls((dist / p).read_text("utf-8"), p, placeholder)) for p in inputs]
+        content = _concat_css(parts)
+    else:
+        # A newline and a semicolon keep a file without a trailing ";" from
+        # running into the next one.
+        content = "\n;".join(minify.js((dist / p).read_text("utf-8")) for p in inputs)
+
+    output = f"{kind}/bundle.{site.bytes_hash(content.encode())[:10]}.{kind}"
+    (dist / output).write_text(content, "utf-8")
+    if entry and entry["output"] != output:
+        still_used = any(e.get("output") == entry["output"] for k, e in manifest.entries.items() if k != key)
+        if not still_used:
+            (dist / entry["output"]).unlink(missing_ok=True)
+    manifest[key] = {"inputs": hashes, "output": output}
+    return output, True
+
+
+def critical_css(css: str) -> str:
+    """Return the subset of minified *css* needed to paint above the fold."""
+    keyframes: dict[str, str] = {}
+
+    def select(text: str) -> list[tuple[str, str | None]]:
+        picked: list[tuple[str, str | None]] = []
+        for prelude, body in minify.css_blocks(text):
+            if body is None:
+                continue
+            if prelude.startswith(("@media", "@supports")):
+                inner = select(body)
+                if inner:
+                    picked.append((prelude, minify.css_join(inner)))
+            elif prelude.startswith("@font-face"):
+                picked.append((prelude, body))
+            elif prelude.startswith(("@keyframes", "@-webkit-keyframes")):
+                keyframes[prelude.split()[-1]] = f"{prelude}{{{body}}}"
+            elif not prelude.startswith("@"):
+                if any(_CRITICAL_RE.match(sel.strip()) for sel in prelude.split(",")):
+                    picked.append((prelude, body))
+        return picked
+
+    rules = minify.css_join(select(css))
+    used = {name for m in _ANIMATION_RE.finditer(rules) for name in re.findall(r"[\w-]+", m.group(1))}
+    return rules + "".join(block for name, block in keyframes.items() if name in used)
+
+
+def _indent_at(text: str, pos: int) -> str:
+    line = text[text.rfind("\n", 0, pos) + 1 : pos]
+    return line if not line.strip() else ""
+
+
+def rewrite(text: str, page: str, styles: str | None, scripts: str | None, critical: str) -> str:
+    """Point *page* at its bundles, inlining *critical* CSS if there is any."""
+    first = {"css": True, "js": True}
+
+    def link(m: re.Match[str]) -> str:
+        attrs = parse_attrs(m.group(0))
+        is_stylesheet = "stylesheet" in (attrs.get("rel") or "").split()
+        if styles is None or not is_stylesheet or not site.is_local(attrs.get("href") or ""):
+            return m.group(0)
+        if not first["css"]:
+            return _DROP
+        first["css"] = False
+        href = site.relative(page, styles)
+        if not critical:
+            return render("link", {"rel": "stylesheet", "href": href})
+        return ("\n" + _indent_at(text, m.start())).join(
+            [
+                # The rules were cut from the bundle, so their url()s are relative to it.
+                f"<style>{rebase_urls(critical, styles, page)}</style>",
+                render("link", {"rel": "preload", "href": href, "as": "style"}),
+                render("link", {"rel": "stylesheet", "href": href, "media": "print", "onload": "this.media='all'"}),
+                f"<noscript>{render('link', {'rel': 'stylesheet', 'href': href})}</noscript>",
+            ]
+        )
+
+    def script(m: re.Match[str]) -> str:
+        attrs = parse_attrs(m.group(0).split(">", 1)[0] + ">")
+        if scripts is None or not site.is_local(attrs.get("src") or ""):
+            return m.group(0)
+        if not first["js"]:
+            return _DROP
+        first["js"] = False
+        return render("script", {"src": site.relative(page, scripts)}) + "</script>"
+
+    text = _SCRIPT_RE.sub(script, _STYLESHEET_RE.sub(link, text))
+    return re.sub(rf"\n[ \t]*{_DROP}[ \t]*(?=\n)|{_DROP}", "", text)
+
+
+def page_inputs(text: str, page: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """Return the local stylesheets and scripts *page* loads, in order."""
+    styles, scripts = [], []
+    for m in _STYLESHEET_RE.finditer(text):
+        attrs = parse_attrs(m.group(0))
+        href = attrs.get("href") or ""
+        if "stylesheet" in (attrs.get("rel") or "").split() and site.is_local(href):
+            styles.append(site.resolve(page, href))
+    for m in _SCRIPT_RE.finditer(text):
+        src = parse_attrs(m.group(0).split(">", 1)[0] + ">").get("src") or ""
+        if site.is_local(src):
+            scripts.append(site.resolve(page, src))
+    return tuple(styles), tuple(scripts)
+
+
+def run(dist: Path = site.DIST) -> None:
+    """Bundle every staged page under *dist*."""
+    manifest = site.Manifest("bundles", dist)
+    live: set[str] = set()
+    rebuilt: set[str] = set()
+    for page in site.pages(dist):
+        path = dist / page
+        text = path.read_text("utf-8")
+        styles, scripts = page_inputs(text, page)
+        outputs: dict[str, str | None] = {"css": None, "js": None}
+        for kind, inputs in (("css", styles), ("js", scripts)):
+            if not inputs:
+                continue
+            key = f"{kind}:{'|'.join(inputs)}"
+            if key in live:
+                outputs[kind] = manifest.get(key)["output"]
+                continue
+            outputs[kind], changed = build_bundle(dist, kind, inputs, manifest)
+            live.add(key)
+            if changed:
+                rebuilt.add(key)
+
+        critical = ""
+        if outputs["css"]:
+            key = f"critical:{outputs['css']}"
+            entry = manifest.get(key)
+            if entry is None:
+                entry = {"css": critical_css((dist / outputs["css"]).read_text("utf-8"))}
+                manifest[key] = entry
+            live.add(key)
+            critical = entry["css"]
+        path.write_text(rewrite(text, page, outputs["css"], outputs["js"], critical), "utf-8")
+
+    for entry in manifest.prune(live):
+        output = entry.get("output")
+        if output and not any(e.get("output") == output for e in manifest.entries.values()):
+            (dist / output).unlink(missing_ok=True)
+    manifest.save()
+    bundles = sum(1 for key in live if not key.startswith("critical:"))
+    print(f"bundle: rebuilt {len(rebuilt)} of {bundles} bundles")
+
+
+def main(argv: list[str] | None = None) -> None:
+    from . import build  # not at module level: build imports every stage
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dist", type=Path, default=site.DIST, help="output tree (default: dist/)")
+    args = parser.parse_args(argv)
+    build.run(args.dist)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Precompression stage.
+
+Writes ``.gz`` (and, when the optional ``brotli`` package is installed,
+``.br``) siblings next to every compressible text asset under ``dist/``, so
+``tools.serve`` can hand them out without compressing on each request.
+``dist/.build/compress.json`` records the hash each sibling was made from,
+so unchanged files are skipped.
+
+    python -m tools.compress
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+from pathlib import Path
+
+from . import site
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip siblings are written without it
+    brotli = None
+
+COMPRESSIBLE_SUFFIXES = {".html", ".css", ".js", ".json", ".svg", ".txt", ".xml", ".webmanifest"}
+
+# Below this size the encoding headers cost more than compression saves.
+MIN_SIZE = 1024
+
+
+def _encoders() -> list[tuple[str, object]]:
+    encoders: list[tuple[str, object]] = [("gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append(("br", lambda data: brotli.compress(data, quality=11)))
+    return encoders
+
+
+def run(dist: Path = site.DIST) -> None:
+    """Write missing or stale compressed siblings for every file in *dist*."""
+    manifest = site.Manifest("compress", dist)
+    encoders = _encoders()
+    live: set[str] = set()
+    written = 0
+    for path in sorted(dist.rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES or ".build" in path.parts:
+            continue
+        if path.stat().st_size < MIN_SIZE:
+            continue
+        rel = path.relative_to(dist).as_posix()
+        live.add(rel)
+        data = path.read_bytes()
+        digest = site.bytes_hash(data)
+        entry = manifest.get(rel) or {}
+        stat = path.stat()
+        for ext, encode in encoders:
+            sibling = path.with_name(f"{path.name}.{ext}")
+            if entry.get(ext) == f"skip:{digest}":
+                continue
+            if entry.get(ext) != digest or not sibling.exists():
+                packed = encode(data)
+                if len(packed) >= len(data):
+                    # Incompressible; remember that instead of retrying every run.
+                    sibling.unlink(missing_ok=True)
+                    entry[ext] = f"skip:{digest}"
+                    continue
+                sibling.write_bytes(packed)
+                entry[ext] = digest
+                written += 1
+            # The stages rewrite pages on every build even when the content
+            # comes out the same, and tools.serve ignores a sibling older than
+            # its original: date the sibling by the hash check, not the write.
+            os.utime(sibling, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        manifest[rel] = entry
+    for rel in set(manifest.entries) - live:
+        for ext, _ in encoders:
+            (dist / f"{rel}.{ext}").unlink(missing_ok=True)
+    manifest.prune(live)
+    manifest.save()
+    print(f"compress: wrote {written} compressed files ({', '.join(ext for ext, _ in encoders)})")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dist", type=Path, default=site.DIST, help="output tree (default: dist/)")
+    args = parser.parse_args(argv)
+    run(args.dist)
+
+
+if __name__ == "__main__":
+    main()
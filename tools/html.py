@@ -0,0 +1,92 @@
+"""Minimal, formatting-preserving HTML tag rewriting.
+
+The pages are hand-written and well-formed, so a regex over individual tags
+is enough; anything not being rewritten is left byte-for-byte as it was.
+"""
+
+from __future__ import annotations
+
+import re
+from html import escape, unescape
+from typing import Callable
+
+ATTR_RE = re.compile(r"""([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+)))?""")
+
+
+def tag_re(name: str) -> re.Pattern[str]:
+    """Return a pattern matching opening ``<name ...>`` tags."""
+    return re.compile(rf"<{name}\b[^>]*>", re.IGNORECASE)
+
+
+def parse_attrs(tag: str) -> dict[str, str | None]:
+    """Parse the attributes of a single opening tag, preserving order.
+
+    Boolean attributes map to ``None``.
+    """
+    body = re.sub(r"^<\w+|/?>$", "", tag)
+    attrs: dict[str, str | None] = {}
+    for m in ATTR_RE.finditer(body):
+        value = next((v for v in m.group(2, 3, 4) if v is not None), None)
+        attrs[m.group(1).lower()] = unescape(value) if value is not None else None
+    return attrs
+
+
+def render(name: str, attrs: dict[str, str | None]) -> str:
+    """Render an opening tag from *attrs*."""
+    parts = [name]
+    for key, value in attrs.items():
+        parts.append(key if value is None else f'{key}="{escape(value, quote=True)}"')
+    return "<" + " ".join(parts) + ">"
+
+
+def sub_tags(name: str, text: str, fn: Callable[[re.Match[str], dict[str, str | None]], str | None]) -> str:
+    """Replace every ``<name>`` tag in *text* with ``fn(match, attrs)``.
+
+    Returning ``None`` from *fn* keeps the original tag untouched.
+    """
+
+    def repl(m: re.Match[str]) -> str:
+        out = fn(m, parse_attrs(m.group(0)))
+        return m.group(0) if out is None else out
+
+    return tag_re(name).sub(repl, text)
+
+
+def inside(text: str, pos: int, name: str) -> bool:
+    """Return True if *pos* lies between an opening and closing ``name`` tag."""
+    opened = text.rfind(f"<{name}", 0, pos)
+    return opened != -1 and text.rfind(f"</{name}>", 0, pos) < opened
+
+
+
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+}
+
+# Comments and script/style bodies are skipped whole; they are not markup.
+_MARKUP_RE = re.compile(
+    r"<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>|<(/?)([a-zA-Z][\w-]*)\b[^>]*>", re.IGNORECASE | re.DOTALL
+)
+
+
+def enclosing_classes(text: str, name: str) -> dict[int, set[str]]:
+    """Map the offset of every ``<name>`` tag to the classes of the elements around it."""
+    found: dict[int, set[str]] = {}
+    stack: list[tuple[str, set[str]]] = []
+    for m in _MARKUP_RE.finditer(text):
+        tag = m.group(3)
+        if tag is None:
+            continue
+        tag = tag.lower()
+        if m.group(2):
+            # Close the innermost element of that name, and anything left open inside it.
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i][0] == tag:
+                    del stack[i:]
+                    break
+            continue
+        if tag == name:
+            found[m.start()] = {cls for _, classes in stack for cls in classes}
+        if tag not in VOID_ELEMENTS and not m.group(0).endswith("/>"):
+            stack.append((tag, set((parse_attrs(m.group(0)).get("class") or "").split())))
+    return found
@@ -0,0 +1,219 @@
+"""Responsive image stage.
+
+Every raster in ``assets/images`` is re-encoded at a ladder of widths as AVIF
+and WebP, and each local ``<img>`` on the site is wrapped in a ``<picture>``
+offering those variants. The original PNG/JPEG stays as the ``<img>``
+fallback, so browsers without AVIF/WebP support behave exactly as before.
+The wrappers have no class and ``css/style.css`` gives them
+``display: contents``, so layout still sees the bare ``<img>``. Small images
+(logos, tool icons) get a ``sizes`` from ``SIZES``, so browsers pick the
+narrow variants for them.
+
+Encoding is incremental: ``dist/.build/images.json`` records the content hash
+each image was encoded from, and only images whose hash changed (or whose
+outputs went missing) are re-encoded. A cold build fans the work out over a
+process pool sized to the machine's cores.
+
+    python -m tools.images [--jobs N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+from . import site
+from .html import enclosing_classes, inside, render, sub_tags
+
+SOURCE_DIR = "assets/images"
+OUTPUT_DIR = "assets/images/_responsive"
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+# Candidate widths; an image is never upscaled past its intrinsic width.
+WIDTHS = (320, 640, 960, 1280, 1920)
+
+# (extension, MIME type, Pillow save options), most preferred first.
+FORMATS = (
+    ("avif", "image/avif", {"quality": 50, "speed": 6}),
+    ("webp", "image/webp", {"quality": 80, "method": 6}),
+)
+
+# Used when an <img> does not declare its own ``sizes`` and none of SIZES applies.
+DEFAULT_SIZES = "100vw"
+
+# ``sizes`` for images laid out much smaller than the viewport, by a class on
+# the <img> or an element around it: the widest CSS box it gets at any
+# breakpoint (css/*.css). Checked in order, so modifiers come first.
+SIZES = {
+    "nav__logo": "60px",
+    "page-loader__logo": "80px",
+    "footer__logo": "90px",
+    "about-me__tool": "74px",
+    "project__tool--large": "200px",
+    "project__tool": "120px",
+    "project__back": "129px",
+}
+
+
+def target_widths(width: int) -> list[int]:
+    """Return the variant widths to produce for an image *width* pixels wide."""
+    top = min(width, WIDTHS[-1])
+    return [w for w in WIDTHS if w < top] + [top]
+
+
+def available_formats() -> list[tuple[str, str, dict]]:
+    """Return the entries of FORMATS that this Pillow build can write."""
+    from PIL import features
+
+    return [fmt for fmt in FORMATS if features.check(fmt[0])]
+
+
+def encode(src: Path, digest: str, out_dir: Path, formats: list[tuple[str, str, dict]]) -> dict:
+    """Encode every variant of *src* into *out_dir* and describe the result.
+
+    Runs inside a worker process, so it only takes picklable arguments.
+    """
+    from PIL import Image
+
+    with Image.open(src) as im:
+        im.load()
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if im.has_transparency_data else "RGB")
+        width, height = im.size
+        variants = []
+        for w in target_widths(width):
+            resized = im if w == width else im.resize((w, round(height * w / width)), Image.Resampling.LANCZOS)
+            for ext, mime, options in formats:
+                name = f"{src.stem}.{digest[:8]}-{w}w.{ext}"
+                resized.save(out_dir / name, **options)
+                variants.append({"path": f"{OUTPUT_DIR}/{name}", "width": w, "type": mime})
+    return {"hash": digest, "width": width, "height": height, "variants": variants}
+
+
+def _outputs_exist(dist: Path, entry: dict) -> bool:
+    return all((dist / v["path"]).is_file() for v in entry["variants"])
+
+
+def _remove_outputs(dist: Path, entry: dict) -> None:
+    for v in entry["variants"]:
+        (dist / v["path"]).unlink(missing_ok=True)
+
+
+def build(dist: Path = site.DIST, jobs: int | None = None) -> site.Manifest:
+    """Encode new or changed images under *dist* and return the manifest."""
+    manifest = site.Manifest("images", dist)
+    out_dir = dist / OUTPUT_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    pending: dict[str, tuple[Path, str]] = {}
+    current: set[str] = set()
+    for src in sorted((dist / SOURCE_DIR).iterdir()):
+        if not src.is_file() or src.suffix.lower() not in RASTER_SUFFIXES:
+            continue
+        rel = src.relative_to(dist).as_posix()
+        current.add(rel)
+        digest = site.file_hash(src)
+        entry = manifest.get(rel)
+        if entry and entry["hash"] == digest and _outputs_exist(dist, entry):
+            continue
+        if entry:
+            _remove_outputs(dist, entry)
+        pending[rel] = (src, digest)
+
+    for entry in manifest.prune(current):
+        _remove_outputs(dist, entry)
+
+    if pending:
+        formats = available_formats()
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+            futures = {
+                rel: pool.submit(encode, src, digest, out_dir, formats) for rel, (src, digest) in pending.items()
+            }
+            for rel, future in futures.items():
+                manifest[rel] = future.result()
+    manifest.save()
+    print(f"images: encoded {len(pending)}, reused {len(current) - len(pending)}")
+    return manifest
+
+
+def srcsets(page: str, entry: dict) -> dict[str, str]:
+    """Return ``{mime: srcset}`` for *entry*, with URLs relative to *page*."""
+    sets: dict[str, list[str]] = {}
+    for v in entry["variants"]:
+        sets.setdefault(v["type"], []).append(f"{quote(site.relative(page, v['path']))} {v['width']}w")
+    return {mime: ", ".join(items) for mime, items in sets.items()}
+
+
+def rewrite(text: str, page: str, manifest: site.Manifest) -> tuple[str, int]:
+    """Wrap the images in one page's markup; return the new text and a count."""
+    count = 0
+    around = enclosing_classes(text, "img")
+    # The sizes each image got, so a preload asks for the same variant.
+    chosen: dict[str, str] = {}
+
+    def entry_for(ref: str | None) -> dict | None:
+        if not ref or not site.is_local(ref):
+            return None
+        entry = manifest.get(site.resolve(page, ref))
+        return entry if entry and entry["variants"] else None
+
+    def img(m: re.Match[str], attrs: dict) -> str | None:
+        nonlocal count
+        entry = entry_for(attrs.get("src"))
+        # Hand-written <picture> elements already do their own art direction.
+        if entry is None or inside(text, m.start(), "picture"):
+            return None
+        classes = set((attrs.get("class") or "").split()) | around.get(m.start(), set())
+        sizes = attrs.get("sizes") or next((v for k, v in SIZES.items() if k in classes), DEFAULT_SIZES)
+        chosen.setdefault(site.resolve(page, attrs["src"]), sizes)
+        sources = "".join(
+            render("source", {"type": mime, "srcset": srcset, "sizes": sizes})
+            for mime, srcset in srcsets(page, entry).items()
+        )
+        count += 1
+        return f"<picture>{sources}{m.group(0)}</picture>"
+
+    def preload(m: re.Match[str], attrs: dict) -> str | None:
+        if attrs.get("rel") != "preload" or attrs.get("as") != "image":
+            return None
+        entry = entry_for(attrs.get("href"))
+        if entry is None:
+            return None
+        # Preload the variant the <picture> will pick, not the PNG fallback.
+        mime, srcset = next(iter(srcsets(page, entry).items()))
+        sizes = chosen.get(site.resolve(page, attrs["href"]), DEFAULT_SIZES)
+        return render("link", {**attrs, "type": mime, "imagesrcset": srcset, "imagesizes": sizes})
+
+    text = sub_tags("img", text, img)
+    text = sub_tags("link", text, preload)
+    return text, count
+
+
+def run(dist: Path = site.DIST, jobs: int | None = None) -> None:
+    """Encode variants and rewrite every staged page under *dist*."""
+    manifest = build(dist, jobs)
+    total = 0
+    for page in site.pages(dist):
+        path = dist / page
+        text, count = rewrite(path.read_text("utf-8"), page, manifest)
+        path.write_text(text, "utf-8")
+        total += count
+    print(f"images: rewrote {total} <img> tags")
+
+
+def main(argv: list[str] | None = None) -> None:
+    from . import build as pipeline  # not at module level: build imports every stage
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dist", type=Path, default=site.DIST, help="output tree (default: dist/)")
+    parser.add_argument("--jobs", type=int, default=None, help="encoder processes (default: all cores)")
+    args = parser.parse_args(argv)
+    pipeline.run(args.dist, jobs=args.jobs)
+
+
+if __name__ == "__main__":
+    main()
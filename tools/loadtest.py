@@ -0,0 +1,142 @@
+"""Load-test harness for ``tools.serve`` (or any HTTP/1.1 server).
+
+Opens ``--concurrency`` keep-alive connections and has each one fetch the
+given paths round-robin until ``--duration`` seconds have passed, then
+reports throughput and latency percentiles.
+
+    python -m tools.serve --quiet &
+    python -m tools.loadtest index.html sound/sound1.ogg --concurrency 64 --duration 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Iterator
+from urllib.parse import urlsplit
+
+import h11
+import trio
+
+DEFAULT_PATHS = ("index.html", "about.html", "gallery.html", "pages/sound-design.html")
+
+
+@dataclass
+class Stats:
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=dict)
+    body_bytes: int = 0
+    errors: int = 0
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def report(self, elapsed: float, concurrency: int) -> dict:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "concurrency": concurrency,
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(len(self.latencies) / elapsed, 1) if elapsed else 0.0,
+            "megabytes_per_second": round(self.body_bytes / elapsed / 1e6, 2) if elapsed else 0.0,
+            "latency_ms": {f"p{p}": round(self.percentile(p) * 1000, 2) for p in (50, 90, 99)},
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+        }
+
+
+Headers = list[tuple[str, str]]
+
+
+async def _fetch(
+    stream: trio.SocketStream, conn: h11.Connection, host: str, target: str, headers: Headers
+) -> tuple[int, int]:
+    request = h11.Request(method="GET", target=target, headers=[("Host", host), *headers])
+    await stream.send_all(conn.send(request) + conn.send(h11.EndOfMessage()))
+    status, size = 0, 0
+    while True:
+        event = conn.next_event()
+        if event is h11.NEED_DATA:
+            data = await stream.receive_some(65536)
+            conn.receive_data(data)
+            continue
+        if isinstance(event, h11.Response):
+            status = event.status_code
+        elif isinstance(event, h11.Data):
+            size += len(event.data)
+        elif isinstance(event, (h11.EndOfMessage, h11.ConnectionClosed)):
+            return status, size
+
+
+async def client(
+    host: str, port: int, targets: Iterator[str], headers: Headers, deadline: float, stats: Stats
+) -> None:
+    """Issue requests on one keep-alive connection until *deadline*."""
+    stream = conn = None
+    while time.perf_counter() < deadline:
+        try:
+            if stream is None:
+                stream = await trio.open_tcp_stream(host, port)
+                conn = h11.Connection(h11.CLIENT)
+            started = time.perf_counter()
+            status, size = await _fetch(stream, conn, f"{host}:{port}", next(targets), headers)
+            stats.latencies.append(time.perf_counter() - started)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.body_bytes += size
+            if conn.our_state is h11.DONE and conn.their_state is h11.DONE:
+                conn.start_next_cycle()
+            else:
+                await stream.aclose()
+                stream = None
+        except (OSError, trio.BrokenResourceError, h11.ProtocolError):
+            stats.errors += 1
+            if stream is not None:
+                await stream.aclose()
+            stream = None
+    if stream is not None:
+        await stream.aclose()
+
+
+async def run(url: str, paths: list[str], concurrency: int, duration: float, headers: Headers) -> dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    base = parts.path.rstrip("/")
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = started + duration
+    async with trio.open_nursery() as nursery:
+        for i in range(concurrency):
+            # Stagger the starting path so clients don't move in lockstep.
+            targets = itertools.islice(itertools.cycle(paths), i % len(paths), None)
+            targets = (f"{base}/{p.lstrip('/')}" for p in targets)
+            nursery.start_soon(client, host, port, targets, headers, deadline, stats)
+    return stats.report(time.perf_counter() - started, concurrency)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", default=list(DEFAULT_PATHS), help="paths to request, round-robin")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server base URL")
+    parser.add_argument("--concurrency", type=int, default=32, help="simultaneous connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--gzip", action="store_true", help="send Accept-Encoding: gzip, br")
+    parser.add_argument("--range", dest="byte_range", help="send a Range header, e.g. bytes=0-65535")
+    args = parser.parse_args(argv)
+
+    headers = []
+    if args.gzip:
+        headers.append(("Accept-Encoding", "gzip, br"))
+    if args.byte_range:
+        headers.append(("Range", args.byte_range))
+    result = trio.run(partial(run, args.url, args.paths, args.concurrency, args.duration, headers))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
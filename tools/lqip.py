@@ -0,0 +1,219 @@
+"""Intrinsic size and placeholder stage.
+
+Every local ``<img>`` gets the ``width`` and ``height`` of its file, so the
+browser reserves the right box before the image arrives (``img`` already has
+``height: auto`` in ``css/style.css``, so CSS widths keep the aspect ratio),
+and a low-quality placeholder painted as its background until it loads:
+
+* ``blur`` (default) - a tiny blurred WebP of the image, inlined as a base64
+  data URI; transparent images keep their alpha, so cut-outs such as
+  ``dragon.png`` show a soft silhouette rather than a box;
+* ``color`` - the image's dominant colour only (opaque images only).
+
+The placeholder is removed by the image's ``onload`` so it never shows
+through transparent pixels. Attributes a page already sets are left alone,
+and images whose CSS sets only a height (the bamboo decorations) get no size
+attributes, since a ``width`` would stop them scaling with that height.
+
+Results are cached in ``dist/.build/lqip.json`` by the image's content hash,
+so a rerun on an unchanged tree only hashes the files.
+
+    python -m tools.lqip [--mode blur|color]
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import re
+from pathlib import Path
+
+from . import minify, site
+from .html import parse_attrs, render, sub_tags
+
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+# Longest side of the blurred placeholder, in pixels.
+PLACEHOLDER_SIZE = 16
+
+# Images smaller than this (icons, arrows) get sizes but no placeholder.
+MIN_PLACEHOLDER_SIDE = 64
+
+MODES = ("blur", "color")
+
+CLEAR_ON_LOAD = "this.style.background=''"
+
+_SIZE_RE = re.compile(r"(?:^|[;{])\s*(width|height)\s*:([^;}]*)", re.I)
+
+
+def describe(path: Path) -> dict:
+    """Return the intrinsic size, dominant colour and blurred placeholder of an image."""
+    from PIL import Image, ImageFilter, features
+
+    with Image.open(path) as im:
+        im.seek(0)
+        width, height = im.size
+        rgba = im.convert("RGBA")
+
+    opaque = rgba.getchannel("A").getextrema()[0] == 255
+    # Averaging the premultiplied image down to one pixel gives the mean
+    # colour with transparent pixels carrying no weight.
+    r, g, b, _ = rgba.convert("RGBa").resize((1, 1), Image.Resampling.BOX).convert("RGBA").getpixel((0, 0))
+    color = f"#{r:02x}{g:02x}{b:02x}"
+
+    scale = PLACEHOLDER_SIZE / max(width, height)
+    tiny = rgba.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.Resampling.LANCZOS)
+    tiny = tiny.filter(ImageFilter.GaussianBlur(0.6))
+    if opaque:
+        tiny = tiny.convert("RGB")
+    buf = io.BytesIO()
+    if features.check("webp"):
+        tiny.save(buf, "WEBP", quality=40)
+        mime = "image/webp"
+    else:
+        tiny.save(buf, "PNG", optimize=True)
+        mime = "image/png"
+    placeholder = f"data:{mime};base64,{base64.b64encode(buf.getvalue()).decode('ascii')}"
+
+    return {"width": width, "height": height, "opaque": opaque, "color": color, "placeholder": placeholder}
+
+
+def build(dist: Path, pages: list[str]) -> dict[str, dict]:
+    """Describe every local raster the pages use; return ``{site path: entry}``."""
+    manifest = site.Manifest("lqip", dist)
+    found: dict[str, dict] = {}
+    live: set[str] = set()
+    described = 0
+    for page in pages:
+        text = (dist / page).read_text("utf-8")
+        for m in re.finditer(r"<img\b[^>]*>", text, re.I):
+            src = re.search(r"""\ssrc\s*=\s*["']([^"']+)""", m.group(0))
+            if not src or not site.is_local(src.group(1)):
+                continue
+            rel = site.resolve(page, src.group(1))
+            path = dist / rel
+            if rel in found or path.suffix.lower() not in RASTER_SUFFIXES or not path.is_file():
+                continue
+            digest = site.file_hash(path)
+            entry = manifest.get(digest)
+            if entry is None:
+                try:
+                    entry = describe(path)
+                except OSError as exc:  # unreadable, e.g. a Git LFS pointer
+                    print(f"lqip: skipping {rel}: {exc}")
+                    continue
+                manifest[digest] = entry
+                described += 1
+            live.add(digest)
+            found[rel] = entry
+    manifest.prune(live)
+    manifest.save()
+    print(f"lqip: described {described}, reused {len(live) - described}")
+    return found
+
+
+def _height_only_classes(css: str, found: set[str]) -> None:
+    for prelude, body in minify.css_blocks(css):
+        if body is None:
+            continue
+        if prelude.startswith("@"):
+            _height_only_classes(body, found)
+            continue
+        sizes = {m.group(1).lower(): m.group(2).strip() for m in _SIZE_RE.finditer(body)}
+        if sizes.get("height", "auto") == "auto" or "width" in sizes:
+            continue
+        for selector in prelude.split(","):
+            subject = re.split(r"[\s>+~]+", selector.strip())[-1]
+            found.update(re.findall(r"\.([\w-]+)", subject))
+
+
+def height_sized(dist: Path, page: str, text: str) -> set[str]:
+    """Return the classes *page*'s stylesheets give a height without a width.
+
+    An image with such a class takes its width from its aspect ratio, which a
+    ``width`` attribute would override.
+    """
+    found: set[str] = set()
+    for m in re.finditer(r"<link\b[^>]*>", text, re.I):
+        attrs = parse_attrs(m.group(0))
+        href = attrs.get("href")
+        if "stylesheet" not in (attrs.get("rel") or "").lower().split() or not href or not site.is_local(href):
+            continue
+        path = dist / site.resolve(page, href)
+        if path.is_file():
+            _height_only_classes(minify.css(path.read_text("utf-8")), found)
+    return found
+
+
+def rewrite(
+    text: str, page: str, entries: dict[str, dict], mode: str, by_height: set[str] = frozenset()
+) -> tuple[str, int]:
+    """Add sizes and placeholders to one page's images; return the text and a count.
+
+    Images with a class in *by_height* (see ``height_sized``) get no size attributes.
+    """
+    count = 0
+
+    def img(m: re.Match[str], attrs: dict) -> str | None:
+        nonlocal count
+        src = attrs.get("src")
+        entry = entries.get(site.resolve(page, src)) if src and site.is_local(src) else None
+        if entry is None:
+            return None
+        changed = False
+        style = attrs.get("style") or ""
+        inline = {m.group(1).lower() for m in _SIZE_RE.finditer(style)}
+        scaled_by_height = bool(set((attrs.get("class") or "").split()) & by_height) or inline == {"height"}
+        if "width" not in attrs and "height" not in attrs and not scaled_by_height:
+            attrs["width"], attrs["height"] = str(entry["width"]), str(entry["height"])
+            changed = True
+
+        wants_placeholder = (
+            min(entry["width"], entry["height"]) >= MIN_PLACEHOLDER_SIDE
+            and "onload" not in attrs
+            and "background" not in style
+            and (mode == "blur" or entry["opaque"])
+        )
+        if wants_placeholder:
+            if mode == "blur":
+                background = f"background:url({entry['placeholder']}) center/contain no-repeat"
+            else:
+                background = f"background:{entry['color']}"
+            attrs["style"] = f"{background};{style}" if style else background
+            attrs["onload"] = CLEAR_ON_LOAD
+            changed = True
+        if not changed:
+            return None
+        count += 1
+        return render("img", attrs)
+
+    return sub_tags("img", text, img), count
+
+
+def run(dist: Path = site.DIST, mode: str = "blur") -> None:
+    """Size and placeholder every staged page's images under *dist*."""
+    pages = site.pages(dist)
+    entries = build(dist, pages)
+    total = 0
+    for page in pages:
+        path = dist / page
+        text = path.read_text("utf-8")
+        text, count = rewrite(text, page, entries, mode, height_sized(dist, page, text))
+        path.write_text(text, "utf-8")
+        total += count
+    print(f"lqip: updated {total} <img> tags")
+
+
+def main(argv: list[str] | None = None) -> None:
+    from . import build as pipeline  # not at module level: build imports every stage
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dist", type=Path, default=site.DIST, help="output tree (default: dist/)")
+    parser.add_argument("--mode", choices=MODES, default="blur", help="placeholder kind (default: blur)")
+    args = parser.parse_args(argv)
+    pipeline.run(args.dist, placeholder=args.mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Conservative CSS and JavaScript minifiers.
+
+Both minifiers only drop comments and insignificant whitespace. They never
+rename anything or reorder code. The JavaScript minifier keeps line breaks
+wherever automatic semicolon insertion might depend on them.
+"""
+
+from __future__ import annotations
+
+import re
+
+# ===== CSS =====
+
+_CSS_TOKEN = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)""", re.S)
+# Whitespace around these characters never matters in CSS. ":" is missing on
+# purpose: ".a :hover" and ".a:hover" are different selectors.
+_CSS_TIGHT = set("{};,>")
+
+
+def css(source: str) -> str:
+    """Strip comments and redundant whitespace from a stylesheet."""
+    out: list[str] = []
+
+    def emit(chunk: str) -> None:
+        if not chunk:
+            return
+        if out and out[-1] == " ":
+            before = out[-2][-1] if len(out) > 1 else ""
+            if not before or before in _CSS_TIGHT or before == ":" or chunk[0] in _CSS_TIGHT:
+                out.pop()
+        out.append(chunk)
+
+    pos = 0
+    for m in _CSS_TOKEN.finditer(source):
+        emit(source[pos : m.start()])
+        pos = m.end()
+        if m.group(1):
+            emit(m.group(1))
+        elif out and out[-1] != " ":
+            out.append(" ")
+    emit(source[pos:])
+    return "".join(out).replace(";}", "}").strip() + "\n"
+
+
+# ===== JAVASCRIPT =====
+
+# A "/" after one of these starts a regular expression, not a division.
+_REGEX_AFTER_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_AFTER_WORDS = {
+    "await", "case", "delete", "do", "else", "in", "new", "of", "return", "throw", "typeof", "void", "yield",
+}
+# Spaces next to these can go; "+", "-", "/" and "*" keep theirs so that
+# "a - -b" or "a / /re/" survive.
+_JS_TIGHT = set("{}()[];,=:<>&|!?")
+# A line break right after these (or right before "}") can never be a
+# statement terminator, so it can go too.
+_JS_NEWLINE_AFTER = set("{;,")
+
+
+def js(source: str) -> str:
+    """Strip comments and redundant whitespace from a script."""
+    out: list[str] = []
+    i, n = 0, len(source)
+
+    def last_token() -> str:
+        for chunk in reversed(out):
+            if chunk.strip():
+                return chunk.rstrip()
+        return ""
+
+    def regex_allowed() -> bool:
+        token = last_token()
+        if not token or token[-1] in _REGEX_AFTER_CHARS:
+            return True
+        m = re.search(r"[\w$]+$", token)
+        return bool(m) and m.group(0) in _REGEX_AFTER_WORDS
+
+    while i < n:
+        c = source[i]
+        if c in "'\"":
+            j = _skip_quoted(source, i)
+        elif c == "`":
+            j = _skip_template(source, i)
+        elif source.startswith("//", i):
+            j = source.find("\n", i)
+            i = n if j == -1 else j
+            continue
+        elif source.startswith("/*", i):
+            j = source.find("*/", i + 2)
+            i = n if j == -1 else j + 2
+            _emit_space(out, source, i, " ")
+            continue
+        elif c == "/" and regex_allowed():
+            j = _skip_regex(source, i)
+        elif c.isspace():
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            _emit_space(out, source, j, "\n" if "\n" in source[i:j] else " ")
+            i = j
+            continue
+        else:
+            j = i + 1
+            while j < n and not source[j].isspace() and source[j] not in "'\"`/":
+                j += 1
+        out.append(source[i:j])
+        i = j
+    return "".join(out).strip() + "\n"
+
+
+def _emit_space(out: list[str], source: str, nxt: int, space: str) -> None:
+    """Append *space* unless the characters on either side make it redundant."""
+    while nxt < len(source) and source[nxt] in " \t":
+        nxt += 1
+    before = out[-1][-1] if out and out[-1] else ""
+    after = source[nxt : nxt + 1]
+    if not before or before in " \n":
+        if space == "\n" and before == " ":
+            out[-1] = out[-1][:-1] + "\n"
+        return
+    if space == "\n":
+        if before in _JS_NEWLINE_AFTER or after == "}":
+            return
+    elif before in _JS_TIGHT or after in _JS_TIGHT:
+        return
+    out.append(space)
+
+
+def _skip_quoted(s: str, i: int) -> int:
+    quote, i = s[i], i + 1
+    while i < len(s) and s[i] != quote:
+        i += 2 if s[i] == "\\" else 1
+    return i + 1
+
+
+def _skip_template(s: str, i: int) -> int:
+    i += 1
+    while i < len(s):
+        c = s[i]
+        if c == "\\":
+            i += 2
+        elif c == "`":
+            return i + 1
+        elif s.startswith("${", i):
+            depth, i = 1, i + 2
+            while i < len(s) and depth:
+                c = s[i]
+                if c in "'\"":
+                    i = _skip_quoted(s, i)
+                    continue
+                if c == "`":
+                    i = _skip_template(s, i)
+                    continue
+                depth += {"{": 1, "}": -1}.get(c, 0)
+                i += 1
+        else:
+            i += 1
+    return i
+
+
+def _skip_regex(s: str, i: int) -> int:
+    i += 1
+    in_class = False
+    while i < len(s):
+        c = s[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            i += 1
+            break
+        elif c == "\n":
+            break
+        i += 1
+    while i < len(s) and (s[i].isalnum() or s[i] == "_"):
+        i += 1
+    return i
+
+
+def css_blocks(source: str) -> list[tuple[str, str | None]]:
+    """Split minified CSS into its top-level ``(prelude, body)`` pairs.
+
+    Statements such as ``@import ...;`` have a body of ``None``. Nested
+    at-rules keep their inner CSS as the body and can be split again.
+    """
+    blocks: list[tuple[str, str | None]] = []
+    i, start, n = 0, 0, len(source)
+    while i < n:
+        c = source[i]
+        if c in "'\"":
+            i = _skip_quoted(source, i)
+            continue
+        if c == ";":
+            if source[start:i].strip():
+                blocks.append((source[start:i].strip(), None))
+            start = i + 1
+        elif c == "{":
+            depth, j = 1, i + 1
+            while j < n and depth:
+                if source[j] in "'\"":
+                    j = _skip_quoted(source, j)
+                    continue
+                depth += {"{": 1, "}": -1}.get(source[j], 0)
+                j += 1
+            blocks.append((source[start:i].strip(), source[i + 1 : j - 1]))
+            i = start = j
+            continue
+        i += 1
+    return blocks
+
+
+def css_join(blocks: list[tuple[str, str | None]]) -> str:
+    """Serialise blocks produced by css_blocks() back into CSS."""
+    return "".join(f"{prelude};" if body is None else f"{prelude}{{{body}}}" for prelude, body in blocks)
@@ -0,0 +1,189 @@
+"""Per-language pre-rendering stage.
+
+The source pages carry both languages: translatable elements have
+``data-vi`` and ``data-en`` attributes, and ``js/main.js`` swaps their text
+after load. This stage writes one finished document per language instead,
+so the toggle is a plain link and nothing moves after first paint:
+
+* ``<page>.vi.html`` and ``<page>.en.html`` for every page, with the text
+  already translated, ``<html lang>`` set and the ``lang-<code>`` body class
+  that positions the philosophy section in ``css/style.css``;
+* ``<page>.html`` is rewritten as the default-language (Vietnamese) document;
+* links between pages stay within the language, and every document lists
+  the others as ``<link rel="alternate" hreflang>``, which is what the
+  language toggle navigates to. A small inline script in ``<head>`` follows
+  the same links when the visitor's saved language differs.
+
+Elements that have only one of the translations (or an empty one) are
+reported; with ``--strict`` they fail the build.
+
+    python -m tools.prerender [--strict]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+from html import escape
+from pathlib import Path
+
+from . import site
+from .html import parse_attrs, render, sub_tags
+
+DEFAULT_LANGUAGE = site.LANGUAGES[0]
+
+_OPEN_RE = re.compile(r"<([a-zA-Z][\w-]*)\b[^>]*>")
+_CHARSET_RE = re.compile(r"<meta\s+charset\b[^>]*>", re.I)
+
+# Runs before anything renders; localStorage can throw in private windows.
+REDIRECT_SCRIPT = (
+    "(function(){try{var l=localStorage.getItem('preferredLang'),"
+    "a=l&&l!==document.documentElement.lang&&"
+    "document.querySelector('link[rel=\"alternate\"][hreflang=\"'+l+'\"]');"
+    "if(a)location.replace(a.href)}catch(e){}})();"
+)
+
+
+def _close_tag(text: str, name: str, pos: int) -> re.Match[str] | None:
+    """Return the ``</name>`` closing the element whose content starts at *pos*."""
+    depth = 1
+    for m in re.finditer(rf"<(/?){name}\b[^>]*>", text[pos:], re.I):
+        depth += -1 if m.group(1) else 1
+        if depth == 0:
+            return m
+    return None
+
+
+def _describe(name: str, attrs: dict[str, str | None]) -> str:
+    cls = attrs.get("class")
+    return f'<{name} class="{cls}">' if cls else f"<{name}>"
+
+
+def check(text: str, page: str) -> list[str]:
+    """Return a message for every element missing one of its translations."""
+    problems = []
+    for m in _OPEN_RE.finditer(text):
+        attrs = parse_attrs(m.group(0))
+        values = {lang: attrs.get(f"data-{lang}") for lang in site.LANGUAGES}
+        if all(v is None for v in values.values()):
+            continue
+        missing = [lang for lang, v in values.items() if v is None]
+        # Both blank is deliberate (e.g. the flower toggle has no text); one
+        # blank next to real text is a translation that was never written.
+        blank = [lang for lang, v in values.items() if v is not None and not v.strip()]
+        if len(blank) == len(values):
+            blank = []
+        for lang in missing:
+            problems.append(f"{page}: {_describe(m.group(1), attrs)} has no data-{lang}")
+        for lang in blank:
+            problems.append(f"{page}: {_describe(m.group(1), attrs)} has an empty data-{lang}")
+    return problems
+
+
+def translate(text: str, lang: str) -> str:
+    """Replace the content of every element carrying ``data-<lang>``."""
+    out: list[str] = []
+    pos = 0
+    for m in _OPEN_RE.finditer(text):
+        if m.start() < pos:
+            continue  # nested inside an element already replaced
+        value = parse_attrs(m.group(0)).get(f"data-{lang}")
+        if value is None:
+            continue
+        close = _close_tag(text, m.group(1), m.end())
+        if close is None:
+            continue
+        out.append(text[pos : m.end()])
+        out.append(escape(value, quote=False))
+        pos = m.end() + close.start()
+    out.append(text[pos:])
+    return "".join(out)
+
+
+def link_pages(text: str, page: str, lang: str, targets: set[str]) -> str:
+    """Point links to other pages at their *lang* copies."""
+
+    def relink(name: str):
+        def repl(m: re.Match[str], attrs: dict) -> str | None:
+            href = attrs.get("href")
+            if not href or not site.is_local(href) or site.resolve(page, href) not in targets:
+                return None
+            suffix = href[len(re.split(r"[?#]", href, maxsplit=1)[0]) :]
+            attrs["href"] = site.relative(page, site.language_variant(site.resolve(page, href), lang)) + suffix
+            return render(name, attrs)
+
+        return repl
+
+    return sub_tags("link", sub_tags("a", text, relink("a")), relink("link"))
+
+
+def document_url(page: str, lang: str) -> str:
+    """Return the page other documents should link to for *lang*."""
+    return page if lang == DEFAULT_LANGUAGE else site.language_variant(page, lang)
+
+
+def mark(text: str, page: str, lang: str) -> str:
+    """Set the document language, body class and alternate links."""
+
+    def html_tag(m: re.Match[str], attrs: dict) -> str:
+        attrs["lang"] = lang
+        return render("html", attrs)
+
+    def body_tag(m: re.Match[str], attrs: dict) -> str:
+        classes = [c for c in (attrs.get("class") or "").split() if not c.startswith("lang-")]
+        attrs["class"] = " ".join([*classes, f"lang-{lang}"])
+        return render("body", attrs)
+
+    text = sub_tags("body", sub_tags("html", text, html_tag), body_tag)
+
+    charset = _CHARSET_RE.search(text)
+    if charset is None:
+        return text
+    line_start = text.rfind("\n", 0, charset.start()) + 1
+    indent = text[line_start : charset.start()]
+    head = [
+        render("link", {"rel": "alternate", "hreflang": other, "href": site.relative(page, document_url(page, other))})
+        for other in site.LANGUAGES
+    ]
+    head.append(f"<script>{REDIRECT_SCRIPT}</script>")
+    insert = "".join(f"\n{indent}{tag}" for tag in head)
+    return text[: charset.end()] + insert + text[charset.end() :]
+
+
+def run(dist: Path = site.DIST, strict: bool = False) -> None:
+    """Write the per-language copies of every staged page under *dist*."""
+    pages = site.pages(dist)
+    targets = set(pages)
+    problems = []
+    for page in pages:
+        path = dist / page
+        text = path.read_text("utf-8")
+        problems += check(text, page)
+        for lang in site.LANGUAGES:
+            rendered = translate(text, lang)
+            if lang != DEFAULT_LANGUAGE:
+                rendered = link_pages(rendered, page, lang, targets)
+            rendered = mark(rendered, page, lang)
+            (dist / site.language_variant(page, lang)).write_text(rendered, "utf-8")
+            if lang == DEFAULT_LANGUAGE:
+                path.write_text(rendered, "utf-8")
+
+    for problem in problems:
+        print(f"prerender: {problem}")
+    print(f"prerender: {len(pages)} pages x {len(site.LANGUAGES)} languages, {len(problems)} missing translations")
+    if strict and problems:
+        raise SystemExit(1)
+
+
+def main(argv: list[str] | None = None) -> None:
+    from . import build  # not at module level: build imports every stage
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dist", type=Path, default=site.DIST, help="output tree (default: dist/)")
+    parser.add_argument("--strict", action="store_true", help="fail when a translation is missing")
+    args = parser.parse_args(argv)
+    build.run(args.dist, strict=args.strict)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""Interaction profiler for the p5 sketches, in headless Chrome.
+
+Replays scripted sessions against a locally served site and reports how
+each running sketch kept up while the visitor scrolled, moved the mouse or
+typed:
+
+* ``scroll`` - scroll ``index.html`` top to bottom and back
+  (``js/background.js``, ``js/about-sketch.js``);
+* ``mouse``  - sweep the pointer across ``index.html`` (``js/cursor.js``);
+* ``about``  - scroll and sweep ``about.html``;
+* ``typing`` - start ``sketch/code`` and type wishes (``sketch.js``).
+
+Every ``p5`` instance's ``redraw`` is wrapped before the page's scripts run,
+so frames are attributed to the sketch that drew them (by the element the
+canvas is parented to). A run reports per sketch the FPS percentiles (p50
+and the slow p10/p1 tail) and draw-time percentiles, long tasks on the main
+thread from the Chrome performance trace, and the JS functions with the most
+self time from a sampling CPU profile.
+
+Reports go to ``.bench/profile/<time>.json`` with one ``.trace.json`` per
+session (open it in the DevTools Performance panel). Pass ``--baseline`` an
+earlier report, or use ``--compare BEFORE AFTER``, to see what changed.
+
+    python -m tools.profile [SESSION ...] [--seconds 10] [--baseline REPORT]
+    python -m tools.profile --compare BEFORE.json AFTER.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from . import bench, browser, site
+
+PROFILE_DIR = bench.HISTORY_DIR / "profile"
+
+TRACE_CATEGORIES = "devtools.timeline,disabled-by-default-devtools.timeline,v8.execute,blink.user_timing"
+
+# Tasks longer than this block input (the Long Tasks API threshold).
+LONG_TASK_MS = 50
+
+# Canvas parent element id -> the file whose sketch draws into it.
+SKETCH_FILES = {
+    "bg-canvas-home-1": "background.js",
+    "bg-canvas-home-2": "background.js",
+    "bg-canvas-about": "about-sketch.js",
+    "bg-canvas-philosophy": "about-sketch.js",
+}
+
+# Wraps p5.prototype.redraw as soon as p5 is defined; records when every
+# frame started and how long its draw() took, per sketch.
+FRAME_SCRIPT = """
+window.__frames = {};
+(() => {
+  const files = %s;
+  function label(inst) {
+    if (inst._isGlobal) return 'sketch.js';
+    const parent = inst.canvas && inst.canvas.parentElement;
+    if (!parent) return 'p5';
+    if (parent === document.body) return 'cursor.js';
+    return (files[parent.id] || 'p5') + ' #' + parent.id;
+  }
+  let real;
+  Object.defineProperty(window, 'p5', {
+    configurable: true,
+    get() { return real; },
+    set(value) {
+      real = value;
+      const redraw = value && value.prototype && value.prototype.redraw;
+      if (!redraw || redraw.__profiled) return;
+      value.prototype.redraw = function (...args) {
+        const start = performance.now();
+        const out = redraw.apply(this, args);
+        const name = this.__profileLabel || (this.canvas ? (this.__profileLabel = label(this)) : 'p5');
+        const frames = window.__frames[name] || (window.__frames[name] = {starts: [], draws: []});
+        frames.starts.push(start);
+        frames.draws.push(performance.now() - start);
+        return out;
+      };
+      value.prototype.redraw.__profiled = true;
+    },
+  });
+})();
+""" % json.dumps(SKETCH_FILES)
+
+
+# ===== SCRIPTED SESSIONS =====
+
+def _viewport(driver) -> tuple[int, int]:
+    return tuple(driver.execute_script("return [window.innerWidth, window.innerHeight];"))
+
+
+def scroll_session(driver, seconds: float) -> None:
+    """Wheel-scroll to the bottom of the page and back up, repeatedly."""
+    from selenium.webdriver.common.action_chains import ActionChains
+
+    step, deadline = 120, time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        at_end = driver.execute_script(
+            "return window.scrollY + window.innerHeight >= document.documentElement.scrollHeight - 2"
+            if step > 0 else "return window.scrollY <= 0;"
+        )
+        if at_end:
+            step = -step
+        chain = ActionChains(driver)
+        for _ in range(10):
+            chain.scroll_by_amount(0, step).pause(0.05)
+        chain.perform()
+
+
+def mouse_session(driver, seconds: float) -> None:
+    """Sweep the pointer along a Lissajous curve at about 60 moves a second."""
+    from selenium.webdriver.common.actions.action_builder import ActionBuilder
+
+    width, height = _viewport(driver)
+    deadline, t = time.monotonic() + seconds, 0
+    while time.monotonic() < deadline:
+        builder = ActionBuilder(driver, duration=16)
+        for _ in range(60):
+            x = int(width / 2 + (width / 2 - 20) * math.sin(t * 0.031))
+            y = int(height / 2 + (height / 2 - 20) * math.sin(t * 0.047))
+            builder.pointer_action.move_to_location(x, y)
+            t += 1
+        builder.perform()
+
+
+def browse_session(driver, seconds: float) -> None:
+    """Alternate a second of scrolling with a second of pointer movement."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        scroll_session(driver, 1)
+        mouse_session(driver, 1)
+
+
+def typing_session(driver, seconds: float) -> None:
+    """Get sketch.js to its wish box and type wishes at about 8 keys a second."""
+    from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.webdriver.common.actions.action_builder import ActionBuilder
+    from selenium.webdriver.common.keys import Keys
+
+    width, height = _viewport(driver)
+    for _ in range(2):  # start screen -> carp -> wish box
+        builder = ActionBuilder(driver)
+        builder.pointer_action.move_to_location(width // 2, height // 2).click()
+        builder.perform()
+        time.sleep(1.5)
+    words = "may the new year bring health and peace to everyone".split()
+    deadline, i = time.monotonic() + seconds, 0
+    while time.monotonic() < deadline:
+        chain = ActionChains(driver)
+        for ch in words[i % len(words)] + " ":
+            chain.send_keys(ch).pause(0.12)
+        chain.perform()
+        i += 1
+    ActionChains(driver).send_keys(Keys.ENTER).perform()
+
+
+@dataclass
+class Session:
+    page: str
+    replay: Callable[[object, float], None]
+
+
+SESSIONS = {
+    "scroll": Session("index.html", scroll_session),
+    "mouse": Session("index.html", mouse_session),
+    "about": Session("about.html", browse_session),
+    "typing": Session("sketch/code/index.html", typing_session),
+}
+
+
+# ===== ANALYSIS =====
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+
+def frame_stats(frames: dict) -> dict:
+    """FPS and draw-time percentiles for one sketch."""
+    starts = frames["starts"]
+    fps = [1000 / (b - a) for a, b in zip(starts, starts[1:]) if b > a]
+    return {
+        "frames": len(starts),
+        # p10/p1 are the slow frames: 10% / 1% of frames ran at this rate or worse.
+        "fps": {"p50": _percentile(fps, 50), "p10": _percentile(fps, 10), "p1": _percentile(fps, 1)},
+        "draw_ms": {
+            "p50": _percentile(frames["draws"], 50),
+            "p95": _percentile(frames["draws"], 95),
+            "max": round(max(frames["draws"]), 2) if frames["draws"] else None,
+        },
+    }
+
+
+def long_tasks(events: list[dict]) -> dict:
+    """Summarise main-thread tasks of at least LONG_TASK_MS in a trace."""
+    main_threads = {
+        (e["pid"], e["tid"])
+        for e in events
+        if e.get("ph") == "M" and e.get("name") == "thread_name" and e.get("args", {}).get("name") == "CrRendererMain"
+    }
+    durations = [
+        e["dur"] / 1000
+        for e in events
+        if e.get("name") == "RunTask" and e.get("ph") == "X" and (e["pid"], e["tid"]) in main_threads
+        and e.get("dur", 0) >= LONG_TASK_MS * 1000
+    ]
+    return {
+        "count": len(durations),
+        "total_ms": round(sum(durations), 1),
+        "max_ms": round(max(durations), 1) if durations else 0.0,
+    }
+
+
+def hot_functions(profile: dict, base: str, top: int) -> list[dict]:
+    """Rank functions by self time in a ``Profiler.stop`` CPU profile."""
+    nodes = {node["id"]: node["callFrame"] for node in profile["nodes"]}
+    self_us: dict[tuple[str, str, int], float] = {}
+    for node_id, delta in zip(profile.get("samples", []), profile.get("timeDeltas", [])):
+        frame = nodes[node_id]
+        if frame["functionName"] in ("(idle)", "(root)"):
+            continue
+        url = frame["url"].removeprefix(base + "/")
+        key = (frame["functionName"] or "(anonymous)", url, frame["lineNumber"] + 1)
+        self_us[key] = self_us.get(key, 0.0) + delta
+    busy = sum(self_us.values()) or 1.0
+    ranked = sorted(self_us.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [
+        {
+            "function": name,
+            "url": url,
+            "line": line,
+            "self_ms": round(us / 1000, 1),
+            "percent": round(100 * us / busy, 1),
+        }
+        for (name, url, line), us in ranked
+    ]
+
+
+# ===== RUNNING =====
+
+def _trace_events(driver) -> list[dict]:
+    events = []
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        if message["method"] == "Tracing.dataCollected":
+            events.append(message["params"])
+    return events
+
+
+def profile_session(driver, base: str, name: str, device: str, seconds: float, top: int, out: Path) -> dict:
+    session = SESSIONS[name]
+    browser.reset(driver, base)
+    browser.set_viewport(driver, device)
+    driver.get(f"{base}/{session.page}")
+    time.sleep(2)  # let preload()/setup() finish before measuring
+    driver.execute_script("window.__frames = {};")
+    _trace_events(driver)  # drop the page-load part of the trace
+    driver.execute_cdp_cmd("Profiler.enable", {})
+    driver.execute_cdp_cmd("Profiler.setSamplingInterval", {"interval": 200})
+    driver.execute_cdp_cmd("Profiler.start", {})
+
+    started = time.monotonic()
+    session.replay(driver, seconds)
+    elapsed = time.monotonic() - started
+
+    cpu = driver.execute_cdp_cmd("Profiler.stop", {})["profile"]
+    driver.execute_cdp_cmd("Profiler.disable", {})
+    frames = driver.execute_script("return window.__frames;") or {}
+    events = _trace_events(driver)
+    out.write_text(json.dumps({"traceEvents": events}), "utf-8")
+    return {
+        "page": session.page,
+        "device": device,
+        "seconds": round(elapsed, 1),
+        "trace": out.name,
+        "sketches": {label: frame_stats(data) for label, data in sorted(frames.items())},
+        "long_tasks": long_tasks(events),
+        "hot_functions": hot_functions(cpu, base, top),
+    }
+
+
+def run(root: Path, names: list[str], device: str, seconds: float, top: int, binary: str | None, out_dir: Path) -> dict:
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    report = {"time": stamp, "commit": bench._commit(), "root": str(root), "sessions": {}}
+    driver = browser.chrome(binary, trace_categories=TRACE_CATEGORIES)
+    try:
+        browser.on_new_document(driver, FRAME_SCRIPT)
+        with browser.local_server(root) as base:
+            for name in names:
+                trace = out_dir / f"{stamp}-{name}.trace.json"
+                report["sessions"][name] = profile_session(driver, base, name, device, seconds, top, trace)
+                print(f"profile: {name} done")
+    finally:
+        driver.quit()
+    (out_dir / f"{stamp}.json").write_text(json.dumps(report, indent=2) + "\n", "utf-8")
+    return report
+
+
+# ===== REPORTING =====
+
+def _delta(before: float | None, after: float | None) -> str:
+    if before is None or after is None:
+        return f"{before} -> {after}"
+    change = after - before
+    return f"{before} -> {after} ({change:+.1f})"
+
+
+def describe(report: dict) -> list[str]:
+    lines = []
+    for name, result in report["sessions"].items():
+        tasks = result["long_tasks"]
+        lines.append(
+            f"{name} ({result['page']}, {result['device']}): "
+            f"{tasks['count']} long tasks, {tasks['total_ms']} ms total, worst {tasks['max_ms']} ms"
+        )
+        for label, stats in result["sketches"].items():
+            fps, draw = stats["fps"], stats["draw_ms"]
+            lines.append(
+                f"  {label:<34} fps p50 {fps['p50']} p10 {fps['p10']} p1 {fps['p1']}  "
+                f"draw p50 {draw['p50']} ms p95 {draw['p95']} ms"
+            )
+        for fn in result["hot_functions"]:
+            lines.append(f"    {fn['self_ms']:>8} ms {fn['percent']:>5}%  {fn['function']}  {fn['url']}:{fn['line']}")
+    return lines
+
+
+def compare(before: dict, after: dict) -> list[str]:
+    """Describe how every session in *after* differs from *before*."""
+    lines = []
+    for name, new in after["sessions"].items():
+        old = before["sessions"].get(name)
+        if old is None:
+            lines.append(f"{name}: not in the baseline")
+            continue
+        lines.append(f"{name}: long tasks {_delta(old['long_tasks']['count'], new['long_tasks']['count'])}, "
+                     f"total {_delta(old['long_tasks']['total_ms'], new['long_tasks']['total_ms'])} ms")
+        for label in sorted(set(old["sketches"]) | set(new["sketches"])):
+            a, b = old["sketches"].get(label), new["sketches"].get(label)
+            if a is None or b is None:
+                lines.append(f"  {label}: {'added' if a is None else 'gone'}")
+                continue
+            lines.append(
+                f"  {label:<34} fps p50 {_delta(a['fps']['p50'], b['fps']['p50'])}, "
+                f"p10 {_delta(a['fps']['p10'], b['fps']['p10'])}; "
+                f"draw p95 {_delta(a['draw_ms']['p95'], b['draw_ms']['p95'])} ms"
+            )
+        old_fns = {(f["function"], f["url"]): f["self_ms"] for f in old["hot_functions"]}
+        new_fns = {(f["function"], f["url"]): f["self_ms"] for f in new["hot_functions"]}
+        for key in sorted(old_fns.keys() | new_fns.keys(), key=lambda k: -max(old_fns.get(k, 0), new_fns.get(k, 0))):
+            lines.append(f"    {key[0]} ({key[1]}): {_delta(old_fns.get(key), new_fns.get(key))} ms")
+    return lines
+
+
+def _load(path: Path) -> dict:
+    return json.loads(path.read_text("utf-8"))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sessions", nargs="*", help=f"sessions to replay: {', '.join(SESSIONS)} (default: all)")
+    parser.add_argument("--root", type=Path, default=site.ROOT,
+                        help="site tree to serve (default: the source tree, so profiles point at real lines)")
+    parser.add_argument("--device", choices=list(browser.VIEWPORTS), default="desktop")
+    parser.add_argument("--seconds", type=float, default=10.0, help="length of each session")
+    parser.add_argument("--top", type=int, default=10, help="hot functions to report per session")
+    parser.add_argument("--baseline", type=Path, help="earlier report to compare this run against")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BEFORE", "AFTER"), help="compare two reports")
+    parser.add_argument("--out", type=Path, default=PROFILE_DIR, help="where reports and traces are written")
+    parser.add_argument("--chrome", help="Chrome/Chromium binary (default: let Selenium find one)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        print("\n".join(compare(_load(args.compare[0]), _load(args.compare[1]))))
+        return
+
+    names = args.sessions or list(SESSIONS)
+    unknown = [name for name in names if name not in SESSIONS]
+    if unknown:
+        parser.error(f"unknown session(s): {', '.join(unknown)}")
+    report = run(args.root.resolve(), names, args.device, args.seconds, args.top, args.chrome, args.out)
+    print("\n".join(describe(report)))
+    print(f"profile: report written to {args.out / (report['time'] + '.json')}")
+    if args.baseline:
+        print(f"\nprofile: compared with {args.baseline}")
+        print("\n".join(compare(_load(args.baseline), report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""Static file server for the built site, on trio and h11.
+
+Serves ``dist/`` (or any ``--root``) with:
+
+* precompressed ``.br`` / ``.gz`` siblings chosen from ``Accept-Encoding``;
+* strong, content-derived ETags and ``304 Not Modified`` responses;
+* ``Cache-Control: immutable`` for content-hashed file names and
+  ``no-cache`` (always revalidate) for everything else;
+* single byte ranges, so ``<audio>`` elements can seek and stream;
+* zero-copy ``os.sendfile`` for response bodies where the OS supports it.
+
+    python -m tools.serve [--root DIR] [--host HOST] [--port PORT]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import email.utils
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from http import HTTPStatus
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+import h11
+import trio
+
+from . import site
+
+# bundle.2962731f61.js, hero-bg.55749038-320w.avif, ...
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{8,}(?:-\d+w)?\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Preferred first.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IDLE_TIMEOUT = 30
+MAX_RECV = 64 * 1024
+SENDFILE_CHUNK = 1 << 20
+READ_CHUNK = 256 * 1024
+
+_TYPES = {
+    ".avif": "image/avif",
+    ".webp": "image/webp",
+    ".ogg": "audio/ogg",
+    ".js": "text/javascript",
+    ".json": "application/json",
+    ".otf": "font/otf",
+    ".ttf": "font/ttf",
+}
+_TEXT_TYPES = ("text/", "application/json", "image/svg+xml")
+
+
+def content_type(path: Path) -> str:
+    ctype = _TYPES.get(path.suffix.lower()) or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return f"{ctype}; charset=utf-8" if ctype.startswith(_TEXT_TYPES) else ctype
+
+
+def cache_control(path: Path) -> str:
+    return IMMUTABLE if HASHED_NAME_RE.search(path.name) else REVALIDATE
+
+
+# ===== ETAGS =====
+
+# path -> (size, mtime_ns, tag); a changed file replaces its entry.
+_etags: dict[str, tuple[int, int, str]] = {}
+
+
+def _digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(READ_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()[:20]
+
+
+async def etag_for(path: Path, stat: os.stat_result) -> str:
+    """Return a strong ETag for *path*, hashing it at most once per version."""
+    version = (stat.st_size, stat.st_mtime_ns)
+    cached = _etags.get(str(path))
+    if cached is not None and cached[:2] == version:
+        return cached[2]
+    tag = '"%s"' % await trio.to_thread.run_sync(_digest, path)
+    _etags[str(path)] = (*version, tag)
+    return tag
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as RFC 9110 requires for If-None-Match."""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+# ===== RANGES =====
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None | bool:
+    """Parse a ``Range`` header against a body of *size* bytes.
+
+    Returns ``(start, end)`` (inclusive) for a satisfiable single range,
+    ``None`` when the header should be ignored (unknown unit or several
+    ranges, both of which may be answered with the full body) and ``False``
+    when the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return False
+    return start, min(end, size - 1)
+
+
+# ===== RESPONSE BODIES =====
+
+
+@dataclass
+class FileSlice:
+    """A byte range of an open file, passed through h11 untouched."""
+
+    fd: int
+    offset: int
+    length: int
+
+    def __len__(self) -> int:
+        return self.length
+
+
+async def send_file(stream: trio.SocketStream, body: FileSlice) -> None:
+    """Send *body* with ``os.sendfile``, falling back to read/send."""
+    offset, remaining = body.offset, body.length
+    sock = stream.socket
+    if hasattr(os, "sendfile"):
+        while remaining:
+            await trio.lowlevel.wait_writable(sock)
+            try:
+                sent = os.sendfile(sock.fileno(), body.fd, offset, min(remaining, SENDFILE_CHUNK))
+            except BlockingIOError:
+                continue
+            except OSError:
+                break  # e.g. a filesystem without sendfile support
+            if sent == 0:
+                raise trio.BrokenResourceError("peer closed connection during sendfile")
+            offset += sent
+            remaining -= sent
+    while remaining:
+        chunk = await trio.to_thread.run_sync(os.pread, body.fd, min(remaining, READ_CHUNK), offset)
+        if not chunk:
+            raise trio.BrokenResourceError("file truncated while sending")
+        await stream.send_all(chunk)
+        offset += len(chunk)
+        remaining -= len(chunk)
+
+
+# ===== REQUEST HANDLING =====
+
+
+def resolve_path(root: Path, target: bytes) -> Path | None:
+    """Map a request target to a file under *root*, or None if there is none."""
+    path = unquote(urlsplit(target.decode("latin-1")).path)
+    parts = [p for p in path.split("/") if p not in ("", ".")]
+    # Dotfiles (the build manifests in .build/, for one) are never served.
+    if any(p == ".." or p.startswith(".") for p in parts):
+        return None
+    try:
+        candidate = root.joinpath(*parts)
+        if candidate.is_dir():
+            candidate = candidate / "index.html"
+        return candidate if candidate.is_file() else None
+    except (OSError, ValueError):  # embedded NULs, names too long, ...
+        return None
+
+
+def _response(status: int, pairs: list[tuple[str, str]]) -> h11.Response:
+    headers = [(k.encode(), v.encode("latin-1")) for k, v in pairs]
+    return h11.Response(status_code=status, headers=headers, reason=HTTPStatus(status).phrase.encode())
+
+
+class Handler:
+    def __init__(self, root: Path, log: bool = True) -> None:
+        self.root = root
+        self.log = log
+
+    async def __call__(self, stream: trio.SocketStream) -> None:
+        conn = h11.Connection(h11.SERVER, max_incomplete_event_size=MAX_RECV)
+        try:
+            while True:
+                with trio.move_on_after(IDLE_TIMEOUT) as idle:
+                    event = await self._next_event(conn, stream)
+                if idle.cancelled_caught or not isinstance(event, h11.Request):
+                    break
+                await self.respond(conn, stream, event)
+                if conn.our_state is h11.MUST_CLOSE:
+                    break
+                # Drain any request body so the next request can be read.
+                while True:
+                    event = await self._next_event(conn, stream)
+                    if isinstance(event, (h11.EndOfMessage, h11.ConnectionClosed)):
+                        break
+                if conn.our_state is not h11.DONE or conn.their_state is not h11.DONE:
+                    break
+                conn.start_next_cycle()
+        except h11.RemoteProtocolError as exc:
+            if conn.our_state in (h11.IDLE, h11.SEND_RESPONSE):
+                with contextlib.suppress(h11.LocalProtocolError, trio.BrokenResourceError):
+                    await self._simple(conn, stream, exc.error_status_hint, b"")
+        except (trio.BrokenResourceError, trio.ClosedResourceError):
+            pass
+        except OSError as exc:  # the response had already started; only this connection is lost
+            print(f"serve: connection dropped: {exc}", file=sys.stderr)
+        finally:
+            await stream.aclose()
+
+    async def _next_event(self, conn: h11.Connection, stream: trio.SocketStream) -> h11.Event:
+        while True:
+            event = conn.next_event()
+            if event is not h11.NEED_DATA:
+                return event
+            conn.receive_data(await stream.receive_some(MAX_RECV))
+
+    async def _send(self, conn: h11.Connection, stream: trio.SocketStream, event: h11.Event) -> None:
+        for piece in conn.send_with_data_passthrough(event) or ():
+            if isinstance(piece, FileSlice):
+                await send_file(stream, piece)
+            else:
+                await stream.send_all(piece)
+
+    async def _simple(
+        self,
+        conn: h11.Connection,
+        stream: trio.SocketStream,
+        status: int,
+        body: bytes,
+        extra: list[tuple[str, str]] | None = None,
+    ) -> None:
+        headers = [*(extra or [])]
+        if status != 304:
+            headers.append(("Content-Length", str(len(body))))
+        if body:
+            headers.append(("Content-Type", "text/plain; charset=utf-8"))
+        await self._send(conn, stream, _response(status, headers))
+        if body:
+            await self._send(conn, stream, h11.Data(data=body))
+        await self._send(conn, stream, h11.EndOfMessage())
+
+    async def respond(self, conn: h11.Connection, stream: trio.SocketStream, request: h11.Request) -> None:
+        try:
+            status = await self._respond(conn, stream, request)
+        except OSError as exc:
+            # E.g. a file a rebuild deleted between lookup and open. Answer
+            # this request, or drop the connection if headers already went out.
+            if conn.our_state is not h11.SEND_RESPONSE:
+                raise
+            if isinstance(exc, (FileNotFoundError, NotADirectoryError)):
+                status, body = 404, b"Not Found\n"
+            else:
+                status, body = 500, b"Internal Server Error\n"
+            await self._simple(conn, stream, status, body)
+        if self.log:
+            print(f"{request.method.decode()} {request.target.decode('latin-1')} {status}", file=sys.stderr)
+
+    async def _respond(self, conn: h11.Connection, stream: trio.SocketStream, request: h11.Request) -> int:
+        if request.method not in (b"GET", b"HEAD"):
+            await self._simple(conn, stream, 405, b"Method Not Allowed\n", [("Allow", "GET, HEAD")])
+            return 405
+        path = resolve_path(self.root, request.target)
+        if path is None:
+            await self._simple(conn, stream, 404, b"Not Found\n")
+            return 404
+
+        req = {k.decode().lower(): v.decode("latin-1") for k, v in request.headers}
+        stat = path.stat()
+        headers = [
+            ("Content-Type", content_type(path)),
+            ("Cache-Control", cache_control(path)),
+            ("Last-Modified", email.utils.formatdate(stat.st_mtime, usegmt=True)),
+        ]
+
+        # Pick a precompressed sibling, unless this is a range request:
+        # ranges are only offered on the identity encoding.
+        served, encoding = path, None
+        siblings = [(name, path.with_name(path.name + ext)) for name, ext in ENCODINGS]
+        siblings = [(name, p) for name, p in siblings if p.is_file()]
+        if siblings:
+            headers.append(("Vary", "Accept-Encoding"))
+            accepted = {e.split(";")[0].strip().lower() for e in req.get("accept-encoding", "").split(",")}
+            if "range" not in req:
+                for name, sibling in siblings:
+                    if name in accepted and sibling.stat().st_mtime_ns >= stat.st_mtime_ns:
+                        served, encoding = sibling, name
+                        headers.append(("Content-Encoding", name))
+                        break
+        if served is not path:
+            stat = served.stat()
+
+        etag = await etag_for(served, stat)
+        headers.append(("ETag", etag))
+        if "if-none-match" in req and etag_matches(req["if-none-match"], etag):
+            kept = [h for h in headers if h[0] in ("ETag", "Cache-Control", "Vary")]
+            await self._simple(conn, stream, 304, b"", kept)
+            return 304
+
+        size = stat.st_size
+        start, length, status = 0, size, 200
+        if encoding is None:
+            headers.append(("Accept-Ranges", "bytes"))
+            if "range" in req and req.get("if-range", etag) == etag:
+                parsed = parse_range(req["range"], size)
+                if parsed is False:
+                    await self._simple(conn, stream, 416, b"", [("Content-Range", f"bytes */{size}")])
+                    return 416
+                if parsed:
+                    start, end = parsed
+                    length, status = end - start + 1, 206
+                    headers.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+        headers.append(("Content-Length", str(length)))
+
+        # Open the file before the headers go out, so a file that vanished
+        # since the stat above can still be answered with a 404.
+        fd = os.open(served, os.O_RDONLY) if request.method == b"GET" and length else None
+        try:
+            await self._send(conn, stream, _response(status, headers))
+            if fd is not None:
+                await self._send(conn, stream, h11.Data(data=FileSlice(fd, start, length)))
+        finally:
+            if fd is not None:
+                os.close(fd)
+        await self._send(conn, stream, h11.EndOfMessage())
+        return status
+
+
+async def serve(root: Path, host: str, port: int, log: bool = True, *, task_status=trio.TASK_STATUS_IGNORED) -> None:
+    """Serve *root* until cancelled."""
+    listeners = await trio.open_tcp_listeners(port, host=host)
+    task_status.started(listeners)
+    await trio.serve_listeners(Handler(root, log), listeners)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--root", type=Path, default=site.DIST, help="directory to serve (default: dist/)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--quiet", action="store_true", help="disable the access log")
+    args = parser.parse_args(argv)
+    root = args.root.resolve()
+    print(f"Serving {root} on http://{args.host}:{args.port}/", file=sys.stderr)
+    try:
+        trio.run(partial(serve, root, args.host, args.port, not args.quiet))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+// ===== SITE SERVICE WORKER =====
+// Template filled in by tools/sw.py - the generated copy is dist/sw.js.
+//
+// - Precache: the HTML shells, CSS/JS, logo, hero image and p5, each stored
+//   under its URL plus the hash of its content. A redeploy ships a new
+//   manifest; install fetches only the entries whose hash changed and
+//   activate deletes the ones that are gone.
+// - Media (sound, video): cache-first at runtime, evicting the least
+//   recently used files once the cache grows past MEDIA_MAX_BYTES.
+// - Versioned CDN files (p5, Google Fonts files): cache-first at runtime.
+
+const PRECACHE = __PRECACHE__;           // [[path, hash], ...] relative to the scope
+const MEDIA_SUFFIXES = __MEDIA_SUFFIXES__;
+const MEDIA_MAX_BYTES = __MEDIA_MAX_BYTES__;
+const CDN_PREFIXES = __CDN_PREFIXES__;
+
+const PRECACHE_CACHE = 'site-precache';
+const MEDIA_CACHE = 'site-media';
+const CDN_CACHE = 'site-cdn';
+const LRU_KEY = '__lru__';               // JSON { url: { size, used } } kept in MEDIA_CACHE
+
+const scope = self.registration.scope;
+const cacheKey = (path, hash) => `${new URL(path, scope).href}?__rev=${hash}`;
+const precacheKeys = new Map(PRECACHE.map(([path, hash]) => [new URL(path, scope).href, cacheKey(path, hash)]));
+
+
+// ===== INSTALL / ACTIVATE =====
+self.addEventListener('install', (event) => {
+  event.waitUntil((async () => {
+    const cache = await caches.open(PRECACHE_CACHE);
+    const cached = new Set((await cache.keys()).map(request => request.url));
+    const missing = [...precacheKeys].filter(([, key]) => !cached.has(key));
+    await Promise.all(missing.map(async ([url, key]) => {
+      const response = await fetch(url, { cache: 'reload' });
+      if (!response.ok) throw new Error(`precache: ${url} returned ${response.status}`);
+      await cache.put(key, response);
+    }));
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil((async () => {
+    const cache = await caches.open(PRECACHE_CACHE);
+    const live = new Set(precacheKeys.values());
+    for (const request of await cache.keys()) {
+      if (!live.has(request.url)) await cache.delete(request);
+    }
+    await self.clients.claim();
+  })());
+});
+
+
+// ===== FETCH ROUTING =====
+self.addEventListener('fetch', (event) => {
+  const request = event.request;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+  url.hash = '';
+
+  if (url.origin === self.location.origin) {
+    url.search = '';
+    if (url.pathname.endsWith('/')) url.pathname += 'index.html';
+    const key = precacheKeys.get(url.href);
+    if (key) {
+      event.respondWith(fromPrecache(request, key));
+    } else if (MEDIA_SUFFIXES.some(suffix => url.pathname.toLowerCase().endsWith(suffix))) {
+      event.respondWith(fromMedia(event, url.href));
+    }
+  } else if (CDN_PREFIXES.some(prefix => request.url.startsWith(prefix))) {
+    event.respondWith(fromCdn(request));
+  }
+});
+
+async function fromPrecache(request, key) {
+  const cached = await caches.match(key, { cacheName: PRECACHE_CACHE });
+  return cached || fetch(request);
+}
+
+async function fromCdn(request) {
+  const cache = await caches.open(CDN_CACHE);
+  const cached = await cache.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  // CDN URLs are versioned, so a stored copy never goes stale.
+  if (response.ok || response.type === 'opaque') await cache.put(request, response.clone());
+  return response;
+}
+
+
+// ===== MEDIA CACHE (size-bounded LRU) =====
+let lruLock = Promise.resolve();
+
+// Runs fn(index, cache) with the LRU index, one update at a time, and saves it.
+function withLru(fn) {
+  lruLock = lruLock.then(async () => {
+    const cache = await caches.open(MEDIA_CACHE);
+    const stored = await cache.match(LRU_KEY);
+    const index = stored ? await stored.json() : {};
+    await fn(index, cache);
+    await cache.put(LRU_KEY, new Response(JSON.stringify(index)));
+  }).catch(() => { });
+  return lruLock;
+}
+
+function remember(url, size) {
+  return withLru(async (index, cache) => {
+    index[url] = { size, used: Date.now() };
+    let total = Object.values(index).reduce((sum, entry) => sum + entry.size, 0);
+    const oldest = Object.keys(index).sort((a, b) => index[a].used - index[b].used);
+    for (const victim of oldest) {
+      if (total <= MEDIA_MAX_BYTES) break;
+      total -= index[victim].size;
+      delete index[victim];
+      await cache.delete(victim);
+    }
+  });
+}
+
+function touch(url) {
+  return withLru(async (index) => {
+    if (index[url]) index[url].used = Date.now();
+  });
+}
+
+// Stores in flight, by URL: the first request for a file streams the network
+// response to the page while a copy goes into the cache, and requests made
+// meanwhile (seeks, a second <audio>) wait for that copy instead of fetching
+// the file again. Each resolves to true once the file is cached.
+const pendingMedia = new Map();
+// Files found too large to cache; requests for them go straight to the network.
+const uncachedMedia = new Set();
+
+async function fromMedia(event, url) {
+  const range = event.request.headers.get('range');
+  const pending = pendingMedia.get(url);
+  if (pending && !(await pending)) return fetch(event.request);
+
+  const cached = await caches.match(url, { cacheName: MEDIA_CACHE });
+  if (cached) {
+    event.waitUntil(touch(url));
+    if (!range) return cached;
+    const type = cached.headers.get('Content-Type') || 'application/octet-stream';
+    return slice(await cached.blob(), type, range);
+  }
+  if (uncachedMedia.has(url)) return fetch(event.request);
+  if (pendingMedia.has(url)) return fromMedia(event, url);  // started while we looked
+
+  // A 200 answers a Range request too; media elements play it as it arrives.
+  // The pending entry is set before the fetch resolves, so requests made
+  // while it is in flight already wait for it.
+  const fetched = fetch(url).then(response => ({ response, copy: response.clone() }));
+  const store = (async () => {
+    const { response, copy } = await fetched;
+    const length = Number(response.headers.get('Content-Length'));
+    if (response.status !== 200 || length > MEDIA_MAX_BYTES) {
+      if (length > MEDIA_MAX_BYTES) uncachedMedia.add(url);
+      if (copy.body) copy.body.cancel();
+      return false;
+    }
+    const cache = await caches.open(MEDIA_CACHE);
+    await cache.put(url, copy);
+    const size = length || (await (await cache.match(url)).blob()).size;
+    if (size > MEDIA_MAX_BYTES) uncachedMedia.add(url);
+    await remember(url, size);  // evicts the file again if it alone is over budget
+    return true;
+  })().catch(() => false).finally(() => pendingMedia.delete(url));
+  pendingMedia.set(url, store);
+  event.waitUntil(store);
+  return (await fetched).response;
+}
+
+function slice(blob, type, range) {
+  const match = /bytes=(\d*)-(\d*)/.exec(range);
+  let start = match && match[1] ? Number(match[1]) : 0;
+  let end = match && match[2] ? Number(match[2]) : blob.size - 1;
+  if (match && !match[1] && match[2]) {
+    start = Math.max(0, blob.size - Number(match[2]));  // bytes=-N: the last N bytes
+    end = blob.size - 1;
+  }
+  end = Math.min(end, blob.size - 1);
+  if (!match || start > end) {
+    return new Response(null, { status: 416, headers: { 'Content-Range': `bytes */${blob.size}` } });
+  }
+  return new Response(blob.slice(start, end + 1), {
+    status: 206,
+    headers: {
+      'Content-Type': type,
+      'Content-Range': `bytes ${start}-${end}/${blob.size}`,
+      'Content-Length': String(end - start + 1),
+      'Accept-Ranges': 'bytes',
+    },
+  });
+}
@@ -0,0 +1,218 @@
+"""Shared paths and helpers for the build stages.
+
+Every stage works on the ``dist/`` copy of the site, never on the source
+files, so the repository keeps working when opened directly in a browser.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import posixpath
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Iterator
+
+ROOT = Path(__file__).resolve().parent.parent
+DIST = ROOT / "dist"
+
+# Top-level pages, in the order they appear in the navigation.
+TOP_PAGES = ("index.html", "about.html", "gallery.html")
+
+# Languages the pages are written in; the first is the one the source files
+# show. ``tools.prerender`` writes a ``<page>.<lang>.html`` copy for each.
+LANGUAGES = ("vi", "en")
+
+# Files and directories that are part of the repository but not of the site.
+# Dot-entries (.git, .build, .bench, ...) are always left out as well.
+IGNORED = {
+    "__pycache__",
+    "dist",
+    "old",
+    "requests.jsonl",
+    "test-animation.html",
+    "tools",
+}
+
+# Per-page byte and LCP budgets, checked by tools.bench and tools.assets.
+BUDGETS = Path(__file__).with_name("budgets.json")
+
+EXTERNAL_PREFIXES = ("http://", "https://", "//", "data:", "mailto:", "tel:", "javascript:", "#")
+
+
+def pages(root: Path = ROOT) -> list[str]:
+    """Return the site's HTML pages as POSIX paths relative to *root*.
+
+    Per-language copies written by ``tools.prerender`` are not included.
+    """
+    found = [name for name in TOP_PAGES if (root / name).is_file()]
+    found += sorted(
+        p.relative_to(root).as_posix()
+        for p in (root / "pages").glob("*.html")
+        if not p.name.endswith(tuple(f".{lang}.html" for lang in LANGUAGES))
+    )
+    return found
+
+
+def language_variant(page: str, lang: str) -> str:
+    """Return the path of *page*'s pre-rendered copy in *lang*."""
+    return f"{page[: -len('.html')]}.{lang}.html"
+
+
+def file_hash(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bytes_hash(data: bytes) -> str:
+    """Return the SHA-256 hex digest of *data*."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_local(ref: str) -> bool:
+    """Return True if *ref* points at a file inside the site tree."""
+    return bool(ref) and not ref.startswith(EXTERNAL_PREFIXES)
+
+
+def resolve(page: str, ref: str) -> str:
+    """Resolve *ref* as written in *page* to a path relative to the site root."""
+    ref = ref.split("#", 1)[0].split("?", 1)[0]
+    if ref.startswith("/"):
+        return posixpath.normpath(ref.lstrip("/"))
+    return posixpath.normpath(posixpath.join(posixpath.dirname(page), ref))
+
+
+def relative(page: str, target: str) -> str:
+    """Return the reference *page* should use to point at site path *target*."""
+    return posixpath.relpath(target, posixpath.dirname(page) or ".")
+
+
+def load_budgets(path: Path = BUDGETS) -> dict:
+    return json.loads(path.read_text("utf-8"))
+
+
+def budget_for(budgets: dict, page: str) -> dict:
+    """Return *page*'s budgets: the defaults overridden by its own entry."""
+    return {**budgets.get("default", {}), **budgets.get("pages", {}).get(page, {})}
+
+
+def _listed_files(root: Path) -> list[str] | None:
+    """Return the files git tracks or would track under *root*, or None outside a checkout."""
+    try:
+        out = subprocess.run(
+            ["git", "ls-files", "--cached", "--others", "--exclude-standard", "-z"],
+            cwd=root,
+            capture_output=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return sorted({name for name in out.stdout.decode("utf-8").split("\0") if name})
+
+
+def _walk(directory: Path) -> Iterator[Path]:
+    for path in sorted(directory.iterdir()):
+        if path.is_dir():
+            yield from _walk(path)
+        else:
+            yield path
+
+
+def iter_site_files(root: Path = ROOT) -> Iterator[Path]:
+    """Yield every file that belongs to the deployable site.
+
+    In a git checkout these are the tracked files plus new ones .gitignore
+    does not exclude; elsewhere every file is a candidate. Dot-entries and
+    anything in ``IGNORED`` are never part of the site.
+    """
+    listed = _listed_files(root)
+    if listed is not None:
+        candidates = (root / name for name in listed)
+    else:
+        candidates = _walk(root)
+    for path in candidates:
+        parts = path.relative_to(root).parts
+        if any(part in IGNORED or part.startswith(".") for part in parts):
+            continue
+        if path.is_file():  # tracked files deleted from the working tree are still listed
+            yield path
+
+
+def stage(dist: Path = DIST, root: Path = ROOT) -> None:
+    """Mirror the source tree into *dist*.
+
+    Unchanged files are left alone, so staging a warm tree only costs a
+    ``stat`` per file. HTML pages are always copied fresh because the later
+    stages rewrite them in place. Files staged by an earlier run whose source
+    is gone are removed, together with a removed page's per-language copies,
+    as is any dot-entry but ``.build/``; what the stages generate is theirs
+    to clean up.
+    """
+    html = set(pages(root))
+    manifest = Manifest("stage", dist)
+    staged: set[str] = set()
+    for src in iter_site_files(root):
+        rel = src.relative_to(root).as_posix()
+        staged.add(rel)
+        dst = dist / rel
+        if rel not in html and dst.exists():
+            s, d = src.stat(), dst.stat()
+            if s.st_size == d.st_size and int(s.st_mtime) == int(d.st_mtime):
+                continue
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(src, dst)
+
+    # Nothing stages a dot-entry, so any besides .build/ is a leftover.
+    for path in dist.glob(".*"):
+        if path.name == ".build":
+            continue
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+    for rel in set(manifest.entries) - staged:
+        gone = [rel]
+        if rel.endswith(".html"):
+            gone += [language_variant(rel, lang) for lang in LANGUAGES]
+        for name in gone:
+            (dist / name).unlink(missing_ok=True)
+    manifest.entries = {rel: {} for rel in sorted(staged)}
+    manifest.save()
+
+
+class Manifest:
+    """A JSON file under ``dist/.build`` recording what a stage produced.
+
+    Stages key entries by the content hash of their inputs so that a rerun
+    only redoes the work whose inputs actually changed.
+    """
+
+    def __init__(self, name: str, dist: Path = DIST) -> None:
+        self.path = dist / ".build" / f"{name}.json"
+        try:
+            self.entries: dict[str, dict] = json.loads(self.path.read_text("utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def get(self, key: str) -> dict | None:
+        return self.entries.get(key)
+
+    def __setitem__(self, key: str, value: dict) -> None:
+        self.entries[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def prune(self, keep: set[str]) -> list[dict]:
+        """Drop entries not in *keep* and return them."""
+        stale = [key for key in self.entries if key not in keep]
+        return [self.entries.pop(key) for key in stale]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.entries, indent=2, sort_keys=True) + "\n", "utf-8")
@@ -0,0 +1,210 @@
+"""Service worker stage.
+
+Writes ``dist/sw.js`` from the ``tools/service-worker.js`` template and
+registers it from every page, so repeat visits and page-to-page navigation
+are served from the local cache instead of the network:
+
+* a precache manifest lists every page (with its other-language copies), the
+  stylesheets, scripts and icons the pages load, the logo and the hero
+  image, and the vendored ``p5.min.js``; each entry carries the hash of its
+  content, so after a redeploy the worker downloads only the entries whose
+  hash changed and drops the ones that disappeared;
+* sound and video files are cached at runtime on first play, keeping the
+  most recently used files up to ``--media-budget`` megabytes;
+* p5 and the Google Fonts files are cached at runtime while a page still
+  loads them from the CDN.
+
+p5 comes from cdnjs until it has been vendored. ``--vendor`` downloads it
+once into ``js/vendor/`` (commit it) and then builds the site; from then on
+the pages load that copy and it is precached with the rest.
+
+    python -m tools.sw [--vendor] [--media-budget 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import urllib.request
+from pathlib import Path
+
+from . import site
+from .html import parse_attrs, render, sub_tags
+
+TEMPLATE = Path(__file__).with_name("service-worker.js")
+OUTPUT = "sw.js"
+
+# Third-party files kept as a local copy: site path -> the URL pages use today.
+VENDOR = {
+    "js/vendor/p5.min.js": "https://cdnjs.cloudflare.com/ajax/libs/p5.js/1.9.0/p5.min.js",
+}
+
+# Precached besides each page's own stylesheets, scripts and icons.
+PRECACHE_ASSETS = ("assets/images/logo.png", "assets/images/hero-bg.png", *VENDOR)
+
+# Of an image's responsive variants, only the AVIF ones are precached: every
+# browser that runs service workers picks those from the pages' srcsets.
+PRECACHE_VARIANT_TYPE = "image/avif"
+
+MEDIA_SUFFIXES = (".ogg", ".mp3", ".wav", ".m4a", ".mp4", ".webm")
+
+# Cross-origin files with versioned URLs, safe to cache without revalidation.
+CDN_PREFIXES = ("https://cdnjs.cloudflare.com/", "https://fonts.gstatic.com/")
+
+DEFAULT_MEDIA_BUDGET_MB = 50
+
+# Revision length, as for the bundle names.
+REVISION_LENGTH = 10
+
+_MARKER = "serviceWorker.register("
+_PRELOADED_RELS = {"stylesheet", "icon", "preload", "modulepreload"}
+
+
+def vendor(root: Path = site.ROOT) -> None:
+    """Download every ``VENDOR`` file into the source tree."""
+    for rel, url in VENDOR.items():
+        path = root / rel
+        print(f"sw: downloading {url}")
+        with urllib.request.urlopen(url, timeout=60) as response:
+            data = response.read()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        print(f"sw: wrote {rel} ({len(data)} bytes)")
+
+
+def localize(text: str, page: str, vendored: set[str]) -> str:
+    """Point *page*'s CDN ``<script>`` tags at the vendored copies."""
+    by_url = {url: rel for rel, url in VENDOR.items() if rel in vendored}
+
+    def script(m: re.Match[str], attrs: dict) -> str | None:
+        rel = by_url.get(attrs.get("src") or "")
+        if rel is None:
+            return None
+        attrs["src"] = site.relative(page, rel)
+        attrs.pop("integrity", None)
+        attrs.pop("crossorigin", None)
+        return render("script", attrs)
+
+    return sub_tags("script", text, script)
+
+
+def register(text: str, page: str) -> str:
+    """Add the inline script registering the worker before ``</body>``."""
+    if _MARKER in text:
+        return text
+    snippet = (
+        "  <script>if('serviceWorker'in navigator)addEventListener('load',()=>"
+        f"navigator.serviceWorker.register('{site.relative(page, OUTPUT)}'))</script>\n"
+    )
+    at = text.lower().rfind("</body>")
+    if at == -1:
+        return text + snippet
+    return text[:at] + snippet + text[at:]
+
+
+def page_assets(text: str, page: str) -> set[str]:
+    """Return the local stylesheets, scripts and icons *page* loads."""
+    found = set()
+    for m in re.finditer(r"<(?:link|script)\b[^>]*>", text, re.I):
+        attrs = parse_attrs(m.group(0))
+        if m.group(0)[1:].lower().startswith("script"):
+            ref = attrs.get("src")
+        elif set((attrs.get("rel") or "").lower().split()) & _PRELOADED_RELS and attrs.get("as") != "image":
+            ref = attrs.get("href")
+        else:
+            continue
+        if ref and site.is_local(ref):
+            found.add(site.resolve(page, ref))
+    return found
+
+
+def precache_paths(dist: Path, documents: list[str]) -> list[str]:
+    """Return every site path the worker should precache, sorted."""
+    paths = set(documents)
+    for page in documents:
+        paths |= page_assets((dist / page).read_text("utf-8"), page)
+    images = site.Manifest("images", dist)
+    for rel in PRECACHE_ASSETS:
+        paths.add(rel)
+        entry = images.get(rel) or {}
+        paths.update(v["path"] for v in entry.get("variants", []) if v["type"] == PRECACHE_VARIANT_TYPE)
+    return sorted(rel for rel in paths if (dist / rel).is_file())
+
+
+def generate(precache: list[list[str]], media_budget: int) -> str:
+    """Fill in the worker template."""
+    values = {
+        "__PRECACHE__": json.dumps(precache, separators=(",", ":")),
+        "__MEDIA_SUFFIXES__": json.dumps(list(MEDIA_SUFFIXES)),
+        "__MEDIA_MAX_BYTES__": str(media_budget),
+        "__CDN_PREFIXES__": json.dumps(list(CDN_PREFIXES)),
+    }
+    text = TEMPLATE.read_text("utf-8")
+    for name, value in values.items():
+        text = text.replace(name, value)
+    return text
+
+
+def run(dist: Path = site.DIST, media_budget_mb: int = DEFAULT_MEDIA_BUDGET_MB) -> None:
+    """Register the worker on every page under *dist* and write ``sw.js``."""
+    vendored = {rel for rel in VENDOR if (dist / rel).is_file()}
+    for rel, url in VENDOR.items():
+        if rel not in vendored:
+            print(f"sw: {rel} not vendored, pages keep loading {url}; fetch it with python -m tools.sw --vendor")
+
+    documents = []
+    for page in site.pages(dist):
+        documents += [page] + [site.language_variant(page, lang) for lang in site.LANGUAGES]
+    documents = [page for page in documents if (dist / page).is_file()]
+    for page in documents:
+        path = dist / page
+        text = path.read_text("utf-8")
+        path.write_text(register(localize(text, page, vendored), page), "utf-8")
+
+    # The manifest remembers the last revisions only to report what a
+    # redeploy makes visitors download again.
+    manifest = site.Manifest("sw", dist)
+    precache = []
+    changed = 0
+    # <page>.vi.html is a byte-identical copy of <page>.html that nothing
+    # links to, so only the pages and their other-language copies are cached.
+    linked = [page for page in documents if not page.endswith(f".{site.LANGUAGES[0]}.html")]
+    for rel in precache_paths(dist, linked):
+        revision = site.file_hash(dist / rel)[:REVISION_LENGTH]
+        entry = manifest.get(rel)
+        if entry is None or entry["revision"] != revision:
+            changed += 1
+        manifest[rel] = {"revision": revision}
+        precache.append([rel, revision])
+    removed = manifest.prune({rel for rel, _ in precache})
+    manifest.save()
+
+    (dist / OUTPUT).write_text(generate(precache, media_budget_mb * 1_000_000), "utf-8")
+    size = sum((dist / rel).stat().st_size for rel, _ in precache)
+    print(
+        f"sw: precaching {len(precache)} files ({round(size / 1024)} KB), "
+        f"{changed} new or changed, {len(removed)} removed"
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    from . import build  # not at module level: build imports every stage
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dist", type=Path, default=site.DIST, help="output tree (default: dist/)")
+    parser.add_argument("--vendor", action="store_true", help="download the VENDOR files, then build")
+    parser.add_argument(
+        "--media-budget",
+        type=int,
+        default=DEFAULT_MEDIA_BUDGET_MB,
+        help=f"megabytes of sound/video kept in the runtime cache (default: {DEFAULT_MEDIA_BUDGET_MB})",
+    )
+    args = parser.parse_args(argv)
+    if args.vendor:
+        vendor()
+    build.run(args.dist, media_budget=args.media_budget)
+
+
+if __name__ == "__main__":
+    main()
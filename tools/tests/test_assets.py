@@ -0,0 +1,84 @@
+"""Tests for the reference scanning and audit checks in ``tools.assets``."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from tools import assets
+
+
+def loading(refs: list[tuple[int, str, bool]]) -> set[str]:
+    return {ref for _, ref, loads in refs if loads}
+
+
+def test_html_refs_loading_attributes() -> None:
+    text = (
+        '<link rel="stylesheet" href="css/a.css"><link rel="preconnect" href="https://x.test">'
+        '<link rel="preload" href="img/hero.png" as="image"><a href="about.html">About</a>'
+        '<script src="js/a.js"></script><video src="v.mp4" poster="v.png"></video>'
+        '<audio src="s.ogg" preload="none"></audio>'
+    )
+    refs = assets.html_refs(text, "index.html")
+    assert {ref for _, ref, _ in refs} >= {"css/a.css", "about.html", "img/hero.png", "s.ogg"}
+    assert loading(refs) == {"css/a.css", "js/a.js", "v.mp4", "v.png"}
+
+
+def test_html_refs_style_urls() -> None:
+    text = '<div style="background: url(\'a.png\')"></div><style>.b { background: url(b.png) }</style>'
+    assert loading(assets.html_refs(text, "index.html")) == {"a.png", "b.png"}
+
+
+def test_html_refs_count_the_largest_srcset_candidate() -> None:
+    text = (
+        '<picture><source type="image/avif" srcset="a-320w.avif 320w, a-640w.avif 640w">'
+        '<source type="image/webp" srcset="a-640w.webp 640w"><img src="a.png"></picture>'
+        '<img src="b.png" srcset="b@2x.png 2x, b.png 1x">'
+        '<img src="c.png">'
+        '<link rel="preload" as="image" href="a.png" imagesrcset="a-320w.avif 320w">'
+    )
+    refs = assets.html_refs(text, "index.html")
+    assert loading(refs) == {"a-640w.avif", "b@2x.png", "c.png"}
+    # The other candidates and the fallbacks are still indexed.
+    assert {"a-320w.avif", "a-640w.webp", "a.png"} <= {ref for _, ref, _ in refs}
+
+
+def test_js_refs() -> None:
+    text = (
+        "img = loadImage('assets/a.png');\n"
+        'const s = new Audio("sound/b.ogg");\n'
+        "for (let i = 0; i < 3; i++) w.push(loadSound(`sound/w${i}.ogg`));\n"
+        "f = loadFont(`${dir}`);\n"
+        "carp = atlas.get('carp on Tet holiday.png');\n"
+    )
+    assert [ref for _, ref in assets.js_refs(text)] == [
+        "assets/a.png",
+        "sound/b.ogg",
+        "sound/w*.ogg",
+        "asset/carp on Tet holiday.png",
+    ]
+
+
+def test_scan_expands_template_literals(tmp_path: Path) -> None:
+    (tmp_path / "sound").mkdir()
+    for name in ("w0.ogg", "w1.ogg", "other.ogg"):
+        (tmp_path / "sound" / name).write_bytes(b"x")
+    (tmp_path / "a.js").write_text("loadSound(`sound/w${i}.ogg`);\n", "utf-8")
+    (tmp_path / "index.html").write_text('<script src="a.js"></script>', "utf-8")
+    index = assets.scan(tmp_path)
+    assert index.targets() == {"a.js", "sound/w0.ogg", "sound/w1.ogg"}
+    assert index.payload("index.html")[1] == ["a.js", "index.html", "sound/w0.ogg", "sound/w1.ogg"]
+
+
+def test_unreferenced_collapses_dead_directories(tmp_path: Path) -> None:
+    files = {
+        "index.html": '<img src="img/used.png">',
+        "img/used.png": "x",
+        "img/spare.png": "xx",
+        "old/a.png": "xxx",
+        "old/deep/b.css": "xxxx",
+        ".bench/c.png": "x",
+    }
+    for rel, content in files.items():
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_text(content, "utf-8")
+    assert assets.unreferenced(assets.scan(tmp_path)) == [("img/spare.png", 1, 2), ("old/", 2, 7)]
@@ -0,0 +1,63 @@
+"""Tests for the precompression stage, ``tools.compress``."""
+
+from __future__ import annotations
+
+import gzip
+import os
+import random
+from pathlib import Path
+
+from tools import compress, site
+
+TEXT = b"body { color: red; }\n" * 100
+
+
+def entries(dist: Path) -> dict:
+    return site.Manifest("compress", dist).entries
+
+
+def test_writes_siblings_dated_like_the_original(tmp_path: Path) -> None:
+    (tmp_path / "a.css").write_bytes(TEXT)
+    (tmp_path / "small.css").write_bytes(b"a{}")
+    compress.run(tmp_path)
+    assert gzip.decompress((tmp_path / "a.css.gz").read_bytes()) == TEXT
+    assert (tmp_path / "a.css.gz").stat().st_mtime_ns == (tmp_path / "a.css").stat().st_mtime_ns
+    assert not (tmp_path / "small.css.gz").exists()
+    assert entries(tmp_path)["a.css"]["gz"] == site.bytes_hash(TEXT)
+
+
+def test_rewritten_but_unchanged_file_only_redates_the_sibling(tmp_path: Path, capsys) -> None:
+    path = tmp_path / "a.css"
+    path.write_bytes(TEXT)
+    compress.run(tmp_path)
+    capsys.readouterr()
+
+    path.write_bytes(TEXT)
+    later = path.stat().st_mtime_ns + 5_000_000_000
+    os.utime(path, ns=(later, later))
+    compress.run(tmp_path)
+    assert "wrote 0 compressed files" in capsys.readouterr().out
+    assert (tmp_path / "a.css.gz").stat().st_mtime_ns == later
+
+
+def test_incompressible_file_is_skipped_until_it_changes(tmp_path: Path) -> None:
+    path = tmp_path / "noise.txt"
+    noise = random.Random(0).randbytes(4096)
+    path.write_bytes(noise)
+    compress.run(tmp_path)
+    assert not (tmp_path / "noise.txt.gz").exists()
+    assert entries(tmp_path)["noise.txt"]["gz"] == f"skip:{site.bytes_hash(noise)}"
+
+    path.write_bytes(TEXT)
+    compress.run(tmp_path)
+    assert (tmp_path / "noise.txt.gz").exists()
+    assert entries(tmp_path)["noise.txt"]["gz"] == site.bytes_hash(TEXT)
+
+
+def test_removes_siblings_of_deleted_files(tmp_path: Path) -> None:
+    (tmp_path / "a.css").write_bytes(TEXT)
+    compress.run(tmp_path)
+    (tmp_path / "a.css").unlink()
+    compress.run(tmp_path)
+    assert not (tmp_path / "a.css.gz").exists()
+    assert "a.css" not in entries(tmp_path)
@@ -0,0 +1,71 @@
+"""Tests for the ``<picture>`` rewriting in ``tools.images``."""
+
+from __future__ import annotations
+
+from tools import images
+
+LOGO = "assets/images/logo.png"
+MANIFEST = {
+    LOGO: {
+        "hash": "0123456789",
+        "width": 640,
+        "height": 640,
+        "variants": [
+            {"path": "assets/images/_responsive/logo.0123456789-320w.avif", "width": 320, "type": "image/avif"},
+            {"path": "assets/images/_responsive/logo.0123456789-640w.avif", "width": 640, "type": "image/avif"},
+            {"path": "assets/images/_responsive/logo.0123456789-320w.webp", "width": 320, "type": "image/webp"},
+        ],
+    },
+}
+
+
+def rewrite(text: str, page: str = "index.html") -> tuple[str, int]:
+    return images.rewrite(text, page, MANIFEST)
+
+
+def test_wraps_local_images() -> None:
+    text, count = rewrite('<img src="../assets/images/logo.png" alt="">', "pages/a.html")
+    assert count == 1
+    assert text == (
+        '<picture><source type="image/avif" srcset="../assets/images/_responsive/logo.0123456789-320w.avif 320w, '
+        '../assets/images/_responsive/logo.0123456789-640w.avif 640w" sizes="100vw">'
+        '<source type="image/webp" srcset="../assets/images/_responsive/logo.0123456789-320w.webp 320w" '
+        'sizes="100vw"><img src="../assets/images/logo.png" alt=""></picture>'
+    )
+
+
+def test_leaves_unknown_and_remote_images_alone() -> None:
+    text = '<img src="assets/images/other.png"><img src="https://x.test/assets/images/logo.png">'
+    assert rewrite(text) == (text, 0)
+
+
+def test_sizes_from_the_image_class_or_an_ancestor() -> None:
+    text, _ = rewrite('<img class="nav__logo" src="assets/images/logo.png">')
+    assert 'sizes="60px"' in text and "100vw" not in text
+    text, _ = rewrite('<div class="project__tool project__tool--large"><img src="assets/images/logo.png"></div>')
+    assert 'sizes="200px"' in text
+    text, _ = rewrite('<img class="nav__logo" sizes="50vw" src="assets/images/logo.png">')
+    assert 'sizes="50vw"' in text and "60px" not in text
+
+
+def test_leaves_hand_written_pictures_alone() -> None:
+    text = (
+        '<picture><source media="(max-width: 600px)" srcset="assets/images/logo-small.png">'
+        '<img src="assets/images/logo.png"></picture>'
+    )
+    assert rewrite(text) == (text, 0)
+
+
+def test_preload_matches_the_first_image() -> None:
+    text = (
+        '<link rel="preload" href="assets/images/logo.png" as="image">'
+        '<img class="footer__logo" src="assets/images/logo.png"><img src="assets/images/logo.png">'
+    )
+    out, _ = rewrite(text)
+    preload = out[: out.index(">") + 1]
+    assert 'type="image/avif"' in preload
+    assert (
+        'imagesrcset="assets/images/_responsive/logo.0123456789-320w.avif 320w, '
+        'assets/images/_responsive/logo.0123456789-640w.avif 640w"'
+    ) in preload
+    assert 'imagesizes="90px"' in preload
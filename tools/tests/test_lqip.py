@@ -0,0 +1,86 @@
+"""Tests for the size and placeholder rewriting in ``tools.lqip``."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from tools import lqip
+
+PHOTO = {"width": 800, "height": 600, "opaque": True, "color": "#336699", "placeholder": "data:image/webp;base64,AA"}
+CUTOUT = {**PHOTO, "opaque": False, "color": "#aa0000"}
+ICON = {**PHOTO, "width": 32, "height": 32}
+ENTRIES = {"img/photo.png": PHOTO, "img/cutout.png": CUTOUT, "img/icon.png": ICON}
+
+
+def rewrite(text: str, mode: str = "blur", by_height: set[str] = frozenset()) -> tuple[str, int]:
+    return lqip.rewrite(text, "index.html", ENTRIES, mode, by_height)
+
+
+def test_blur_mode_adds_sizes_and_placeholder() -> None:
+    text, count = rewrite('<img src="img/photo.png" alt="">')
+    assert count == 1
+    assert text == (
+        '<img src="img/photo.png" alt="" width="800" height="600" '
+        'style="background:url(data:image/webp;base64,AA) center/contain no-repeat" '
+        'onload="this.style.background=&#x27;&#x27;">'
+    )
+
+
+def test_color_mode_skips_transparent_images() -> None:
+    text, _ = rewrite('<img src="img/photo.png">', mode="color")
+    assert 'style="background:#336699"' in text
+    text, _ = rewrite('<img src="img/cutout.png">', mode="color")
+    assert text == '<img src="img/cutout.png" width="800" height="600">'
+    text, _ = rewrite('<img src="img/cutout.png">', mode="blur")
+    assert "base64" in text
+
+
+def test_small_images_get_sizes_only() -> None:
+    assert rewrite('<img src="img/icon.png">') == ('<img src="img/icon.png" width="32" height="32">', 1)
+
+
+def test_images_sized_by_height_get_no_size_attributes() -> None:
+    text, _ = rewrite('<img class="bamboo left" src="img/photo.png">', by_height={"bamboo"})
+    assert "width=" not in text and "height=" not in text
+    assert "background:url(" in text
+
+
+def test_inline_height_only() -> None:
+    text, _ = rewrite('<img src="img/photo.png" style="height: 40vh">')
+    assert "width=" not in text
+    assert 'style="background:url(data:image/webp;base64,AA) center/contain no-repeat;height: 40vh"' in text
+    text, _ = rewrite('<img src="img/photo.png" style="height: 40vh; width: 10vw">')
+    assert 'width="800" height="600"' in text
+    # A property merely ending in "height" is not a height.
+    text, _ = rewrite('<img src="img/photo.png" style="line-height: 2">')
+    assert 'width="800" height="600"' in text
+
+
+def test_keeps_what_the_page_already_sets() -> None:
+    text = '<img src="img/photo.png" width="10" height="20" onload="go()">'
+    assert rewrite(text) == (text, 0)
+    text, _ = rewrite('<img src="img/photo.png" style="background: red">')
+    assert text == '<img src="img/photo.png" style="background: red" width="800" height="600">'
+
+
+def test_leaves_unknown_images_alone() -> None:
+    text = '<img src="img/other.png"><img src="https://x.test/img/photo.png">'
+    assert rewrite(text) == (text, 0)
+
+
+def test_height_sized(tmp_path: Path) -> None:
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "a.css").write_text(
+        """
+        .bamboo { height: 100vh; }
+        .box img.tall, .other { height: 50%; }
+        .logo { height: 40px; width: 40px; }
+        .line { line-height: 2; }
+        .auto { height: auto; }
+        @media (max-width: 600px) { .stem { height: 30vh } }
+        """,
+        "utf-8",
+    )
+    (tmp_path / "css" / "unused.css").write_text(".ghost { height: 1px }", "utf-8")
+    page = '<link rel="stylesheet" href="../css/a.css"><link rel="preload" href="../css/unused.css" as="style">'
+    assert lqip.height_sized(tmp_path, "pages/a.html", page) == {"bamboo", "tall", "other", "stem"}
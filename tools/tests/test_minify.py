@@ -0,0 +1,150 @@
+"""Differential tests for ``tools.minify`` and the critical-CSS split.
+
+Every JavaScript case is run through ``node`` before and after minifying and
+must print the same thing.
+"""
+
+from __future__ import annotations
+
+import shutil
+import subprocess
+
+import pytest
+
+from tools import bundle, minify
+
+NODE = shutil.which("node")
+
+
+def run_js(source: str) -> str:
+    out = subprocess.run([NODE, "-e", source], capture_output=True, text=True, timeout=30)
+    assert out.returncode == 0, out.stderr
+    return out.stdout
+
+
+JS_CASES = {
+    "asi": """
+        let a = 1
+        let b = a
+        ++b
+        const c = [a, b]
+        console.log(a, b, c)
+    """,
+    "asi_return": """
+        function f() {
+          return
+            42
+        }
+        console.log(f())
+    """,
+    "asi_member_access": """
+        const x = [3, 4]
+        const y = x
+        [1]
+        console.log(y)
+    """,
+    "division": """
+        const a = 10 / 2 / 5
+        const b = (a + 4) / 2
+        const arr = [8]
+        console.log(a, b, arr[0] / 2 / 2, a /2/ 1)
+    """,
+    "postfix_then_division": """
+        let i = 4, j = 8
+        const k = i++ / 2
+        const l = j-- / 2 / 1
+        console.log(i, j, k, l)
+    """,
+    "regex": """
+        const r = /ab+c/g
+        function g(s) { return /^[/]\\d+$/.test(s) }
+        const t = typeof /x/
+        const parts = 'a/b//c'.split(/\\//)
+        console.log(r.test('abbc'), g('/12'), t, parts, [/=/.source, (/x/).flags])
+    """,
+    "regex_after_keyword": """
+        function h(x) { if (x) return /yes/.source; else return /n\\/o/.source }
+        console.log(h(1), h(0), 'x'.replace(/x/, '//not a comment'))
+    """,
+    "comments_and_strings": """
+        // line comment
+        const s = "// not a comment", t = '/* nor this */' /* but this is */
+        const u = 'it\\'s' + "a \\"quote\\""
+        console.log(s, t, u)
+    """,
+    "template_literals": """
+        const name = 'p5'
+        const nested = `outer ${`inner ${name} // still text`} /* text */`
+        const obj = `${ { a: 1 }.a + 1 }`
+        const multi = `line one
+          line two`
+        console.log(nested, obj, multi)
+    """,
+    "unary_spacing": """
+        let a = 5, b = 2
+        console.log(a - -b, a + +b, a - - - b, a / /2/.source.length)
+    """,
+}
+
+
+@pytest.mark.skipif(NODE is None, reason="node is not installed")
+@pytest.mark.parametrize("name", sorted(JS_CASES))
+def test_js_minify_keeps_behaviour(name: str) -> None:
+    source = JS_CASES[name]
+    assert run_js(minify.js(source)) == run_js(source)
+
+
+def test_js_minify_shrinks() -> None:
+    source = JS_CASES["comments_and_strings"]
+    minified = minify.js(source)
+    assert "line comment" not in minified and "but this is" not in minified
+    assert '"// not a comment"' in minified and "'/* nor this */'" in minified
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        (".a  :hover { color: red ; }", ".a :hover{color:red}\n"),
+        (".a > .b ,\n.c { margin: 0 auto }", ".a>.b,.c{margin:0 auto}\n"),
+        ('.a::before { content: "  /* kept */  "; }', '.a::before{content:"  /* kept */  "}\n'),
+        ("/* gone */ @media (max-width: 600px) { .a { top: 0 } }", "@media (max-width:600px){.a{top:0}}\n"),
+    ],
+)
+def test_css_minify(source: str, expected: str) -> None:
+    assert minify.css(source) == expected
+
+
+def test_css_blocks_nest() -> None:
+    blocks = minify.css_blocks(minify.css('@import "a.css"; @media print { .a { b: c } } .d { e: f }'))
+    assert blocks == [('@import "a.css"', None), ("@media print", ".a{b:c}"), (".d", "e:f")]
+
+
+def test_critical_css_picks_above_the_fold_rules() -> None:
+    css = minify.css(
+        """
+        .header { top: 0 }
+        .header__logo, .footer { width: 60px }
+        .footer { color: red }
+        .headerless { color: blue }
+        @media (max-width: 600px) { .nav { display: none } .footer { margin: 0 } }
+        @keyframes spin { to { transform: rotate(1turn) } }
+        @keyframes unused { to { opacity: 0 } }
+        .page-loader__logo { animation: spin 1s infinite }
+        """
+    )
+    critical = bundle.critical_css(css)
+    assert ".header{top:0}" in critical
+    assert ".header__logo,.footer{width:60px}" in critical
+    assert "color:red" not in critical and ".headerless" not in critical
+    assert "@media (max-width:600px){.nav{display:none}}" in critical
+    assert "@keyframes spin" in critical and "@keyframes unused" not in critical
+
+
+def test_inlined_critical_css_is_rebased_to_the_page() -> None:
+    text = '<head>\n  <link rel="stylesheet" href="../css/style.css">\n</head>'
+    critical = ".hero{background:url(../assets/images/hero-bg.png)}"
+    out = bundle.rewrite(text, "pages/a.html", "css/bundle.0123456789.css", None, critical)
+    assert "<style>.hero{background:url(../assets/images/hero-bg.png)}</style>" in out
+    out = bundle.rewrite(text, "index.html", "css/bundle.0123456789.css", None, critical)
+    assert "<style>.hero{background:url(assets/images/hero-bg.png)}</style>" in out
+    assert '<link rel="preload" href="css/bundle.0123456789.css" as="style">' in out
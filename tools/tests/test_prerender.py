@@ -0,0 +1,44 @@
+"""Tests for the translation step of ``tools.prerender``."""
+
+from __future__ import annotations
+
+from tools import prerender
+
+
+def test_replaces_element_text() -> None:
+    text = '<h1 class="t" data-vi="Xin chào" data-en="Hello">Xin chào</h1>'
+    assert prerender.translate(text, "en") == '<h1 class="t" data-vi="Xin chào" data-en="Hello">Hello</h1>'
+
+
+def test_escapes_translation() -> None:
+    text = '<p data-en="A &amp; B &lt;i&gt;">x</p>'
+    assert prerender.translate(text, "en") == '<p data-en="A &amp; B &lt;i&gt;">A &amp; B &lt;i&gt;</p>'
+
+
+def test_matches_the_right_closing_tag() -> None:
+    text = '<div data-en="New"><div>a</div><div>b</div></div><div>after</div>'
+    assert prerender.translate(text, "en") == '<div data-en="New">New</div><div>after</div>'
+
+
+def test_nested_translations_are_replaced_with_their_parent() -> None:
+    text = '<div data-en="Outer"><span data-en="Inner">i</span></div><span data-en="Next">n</span>'
+    expected = '<div data-en="Outer">Outer</div><span data-en="Next">Next</span>'
+    assert prerender.translate(text, "en") == expected
+
+
+def test_leaves_other_elements_alone() -> None:
+    text = '<p data-vi="Chỉ tiếng Việt">Chỉ tiếng Việt</p>\n<p>plain</p>\n<img data-en="no content">'
+    assert prerender.translate(text, "en") == text
+
+
+def test_check_reports_missing_and_empty_translations() -> None:
+    text = (
+        '<p class="a" data-vi="Có">Có</p>'
+        '<p class="b" data-vi="Có" data-en=" ">Có</p>'
+        '<span data-vi="" data-en=""></span>'  # both blank on purpose
+        '<p data-vi="Có" data-en="Yes">Có</p>'
+    )
+    assert prerender.check(text, "page.html") == [
+        'page.html: <p class="a"> has no data-en',
+        'page.html: <p class="b"> has an empty data-en',
+    ]
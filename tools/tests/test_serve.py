@@ -0,0 +1,199 @@
+"""Tests for ``tools.serve``: Range parsing, and the handler on a real listener."""
+
+from __future__ import annotations
+
+import gzip
+import http.client
+import os
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlsplit
+
+import pytest
+import trio
+
+from tools import browser, serve
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-", (0, 999)),
+        ("bytes=0-0", (0, 0)),
+        ("bytes=100-199", (100, 199)),
+        ("bytes=999-", (999, 999)),
+        ("BYTES = 10-20", (10, 20)),
+        # End past the body is clamped, not refused.
+        ("bytes=500-5000", (500, 999)),
+        # Suffix ranges: the last N bytes, or the whole body if N is larger.
+        ("bytes=-100", (900, 999)),
+        ("bytes=-1", (999, 999)),
+        ("bytes=-5000", (0, 999)),
+    ],
+)
+def test_satisfiable(header: str, expected: tuple[int, int]) -> None:
+    assert serve.parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        "bytes=1000-",  # starts at the end
+        "bytes=5000-6000",  # entirely past the end
+        "bytes=20-10",  # end before start
+        "bytes=-0",  # empty suffix
+    ],
+)
+def test_unsatisfiable(header: str) -> None:
+    assert serve.parse_range(header, SIZE) is False
+
+
+def test_empty_body_cannot_satisfy_any_range() -> None:
+    assert serve.parse_range("bytes=0-", 0) is False
+    assert serve.parse_range("bytes=-10", 0) is False
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        "items=0-10",  # unknown unit
+        "bytes=0-10,20-30",  # several ranges
+        "bytes=abc-",
+        "bytes=10",
+        "bytes=",
+    ],
+)
+def test_ignored(header: str) -> None:
+    assert serve.parse_range(header, SIZE) is None
+
+
+# ===== HANDLER =====
+
+BODY = b"body { color: red; }\n" * 50
+
+
+@pytest.fixture
+def root(tmp_path: Path) -> Path:
+    (tmp_path / "style.css").write_bytes(BODY)
+    (tmp_path / "style.css.gz").write_bytes(gzip.compress(BODY))
+    (tmp_path / "plain.txt").write_bytes(b"0123456789")
+    return tmp_path
+
+
+@pytest.fixture
+def get(root: Path) -> Iterator:
+    with browser.local_server(root) as base:
+        address = urlsplit(base).netloc
+
+        def get(path: str, method: str = "GET", **headers: str) -> tuple[int, dict[str, str], bytes]:
+            conn = http.client.HTTPConnection(address, timeout=10)
+            try:
+                conn.request(method, path, headers={k.replace("_", "-"): v for k, v in headers.items()})
+                response = conn.getresponse()
+                return response.status, dict(response.getheaders()), response.read()
+            finally:
+                conn.close()
+
+        yield get
+
+
+def test_serves_the_precompressed_copy_when_accepted(get) -> None:
+    status, headers, body = get("/style.css", Accept_Encoding="br, gzip")
+    assert status == 200
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == BODY
+
+    status, headers, body = get("/style.css")
+    assert "Content-Encoding" not in headers
+    assert headers["Vary"] == "Accept-Encoding"
+    assert body == BODY
+
+
+def test_stale_sibling_is_not_served(root: Path, get) -> None:
+    stat = (root / "style.css").stat()
+    os.utime(root / "style.css.gz", ns=(stat.st_atime_ns, stat.st_mtime_ns - 1_000_000_000))
+    status, headers, body = get("/style.css", Accept_Encoding="gzip")
+    assert "Content-Encoding" not in headers
+    assert body == BODY
+
+
+def test_no_vary_without_siblings(get) -> None:
+    _, headers, _ = get("/plain.txt", Accept_Encoding="gzip")
+    assert "Vary" not in headers
+
+
+def test_if_none_match(get) -> None:
+    _, headers, _ = get("/style.css", Accept_Encoding="gzip")
+    etag = headers["ETag"]
+    status, headers, body = get("/style.css", Accept_Encoding="gzip", If_None_Match=f'"other", W/{etag}')
+    assert (status, body) == (304, b"")
+    assert headers["ETag"] == etag
+    # The identity copy has its own tag.
+    status, _, _ = get("/style.css", If_None_Match=etag)
+    assert status == 200
+
+
+def test_range_skips_the_precompressed_copy(get) -> None:
+    status, headers, body = get("/style.css", Accept_Encoding="gzip", Range="bytes=0-3")
+    assert status == 206
+    assert "Content-Encoding" not in headers
+    assert headers["Content-Range"] == f"bytes 0-3/{len(BODY)}"
+    assert body == BODY[:4]
+
+
+def test_unsatisfiable_range(get) -> None:
+    status, headers, _ = get("/plain.txt", Range="bytes=50-")
+    assert status == 416
+    assert headers["Content-Range"] == "bytes */10"
+
+
+def test_if_range(get) -> None:
+    _, headers, _ = get("/plain.txt")
+    etag = headers["ETag"]
+    status, _, body = get("/plain.txt", Range="bytes=2-4", If_Range=etag)
+    assert (status, body) == (206, b"234")
+    # A stale validator gets the whole, current file.
+    status, _, body = get("/plain.txt", Range="bytes=2-4", If_Range='"stale"')
+    assert (status, body) == (200, b"0123456789")
+
+
+def test_head(get) -> None:
+    status, headers, body = get("/plain.txt", method="HEAD")
+    assert (status, body) == (200, b"")
+    assert headers["Content-Length"] == "10"
+
+
+def test_missing_file(get) -> None:
+    assert get("/nope.txt")[0] == 404
+    assert get("/.build/images.json")[0] == 404
+
+
+@pytest.mark.parametrize("error, expected", [(FileNotFoundError, 404), (PermissionError, 500)])
+def test_file_that_disappears_before_open(monkeypatch, get, error: type[OSError], expected: int) -> None:
+    real_open = os.open
+
+    def failing_open(path, *args, **kwargs):
+        if str(path).endswith("plain.txt"):
+            raise error(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(serve.os, "open", failing_open)
+    status, _, _ = get("/plain.txt")
+    assert status == expected
+    # The server keeps answering.
+    assert get("/style.css")[0] == 200
+
+
+def test_etag_entry_is_replaced_when_the_file_changes(tmp_path: Path) -> None:
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"one")
+    known = len(serve._etags)
+    first = trio.run(serve.etag_for, path, path.stat())
+    path.write_bytes(b"two!")
+    second = trio.run(serve.etag_for, path, path.stat())
+    assert first != second
+    assert serve._etags[str(path)][2] == second
+    assert len(serve._etags) == known + 1
@@ -0,0 +1,78 @@
+"""Tests for the service worker stage, ``tools.sw``."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from tools import site, sw
+
+P5_URL = sw.VENDOR["js/vendor/p5.min.js"]
+
+
+def write(root: Path, files: dict[str, str]) -> None:
+    for rel, content in files.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(content, "utf-8")
+
+
+def test_register_adds_the_script_once() -> None:
+    text = "<body>\n  <p>x</p>\n</body>"
+    once = sw.register(text, "pages/a.html")
+    assert "navigator.serviceWorker.register('../sw.js')" in once
+    assert once.endswith("</script>\n</body>")
+    assert sw.register(once, "pages/a.html") == once
+
+
+def test_localize_points_vendored_scripts_at_the_copy() -> None:
+    text = f'<script src="{P5_URL}" integrity="sha512-x" crossorigin="anonymous"></script>'
+    assert sw.localize(text, "pages/a.html", set()) == text
+    assert sw.localize(text, "pages/a.html", {"js/vendor/p5.min.js"}) == (
+        '<script src="../js/vendor/p5.min.js"></script>'
+    )
+
+
+def test_page_assets() -> None:
+    text = (
+        '<link rel="stylesheet" href="../css/a.css"><link rel="icon" href="../i.png">'
+        '<link rel="preload" href="../hero.png" as="image"><link rel="preconnect" href="https://x.test">'
+        '<script src="../js/a.js"></script><script src="https://cdn.test/p5.js"></script>'
+    )
+    assert sw.page_assets(text, "pages/a.html") == {"css/a.css", "i.png", "js/a.js"}
+
+
+def test_precache_paths(tmp_path: Path) -> None:
+    write(
+        tmp_path,
+        {
+            "index.html": '<link rel="stylesheet" href="css/a.css"><script src="js/missing.js"></script>',
+            "index.en.html": "<p>en</p>",
+            "css/a.css": "a{}",
+            "assets/images/logo.png": "png",
+            "assets/images/_responsive/logo.1234567890-60w.avif": "avif",
+            "assets/images/_responsive/logo.1234567890-60w.webp": "webp",
+        },
+    )
+    images = site.Manifest("images", tmp_path)
+    images["assets/images/logo.png"] = {
+        "variants": [
+            {"path": "assets/images/_responsive/logo.1234567890-60w.avif", "type": "image/avif"},
+            {"path": "assets/images/_responsive/logo.1234567890-60w.webp", "type": "image/webp"},
+        ]
+    }
+    images.save()
+    assert sw.precache_paths(tmp_path, ["index.html", "index.en.html"]) == [
+        "assets/images/_responsive/logo.1234567890-60w.avif",
+        "assets/images/logo.png",
+        "css/a.css",
+        "index.en.html",
+        "index.html",
+    ]
+
+
+def test_run_leaves_the_vi_copies_out_of_the_precache(tmp_path: Path) -> None:
+    write(tmp_path, {"index.html": "<body></body>", "index.vi.html": "<body></body>", "index.en.html": "<body></body>"})
+    sw.run(tmp_path)
+    precached = set(site.Manifest("sw", tmp_path).entries)
+    assert precached == {"index.html", "index.en.html"}
+    assert "register('sw.js')" in (tmp_path / "index.vi.html").read_text("utf-8")
+    assert '["index.html",' in (tmp_path / "sw.js").read_text("utf-8")